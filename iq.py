@@ -40,12 +40,20 @@
 #   adm dialout audio video input (plus user's own group, e.g., pi)
 
 import sys,time, threading, os, subprocess
+import iq_opt as options
+
+if options.opt.headless:        # No display: DSP to a sink (iq_sink)
+    import iq_sink
+    iq_sink.run(options.opt)
+    sys.exit()
+
 import pygame as pg
 import numpy  as np
 import iq_dsp as dsp
 import iq_wf  as wf
 import iq_sc  as sc
-import iq_opt as options
+import iq_gov as gov
+import iq_src
 
 # Some colors in PyGame style
 BLACK =    (  0,   0,   0)
@@ -83,16 +91,28 @@ print "rev i/q       :", opt.rev_iq
 print "sample rate   :", opt.sample_rate
 print "size          :", opt.size
 print "buffers       :", opt.buffers
+print "fft backend   :", opt.fft_backend, "(%d workers)" % opt.fft_workers
+print "single precis.:", opt.single
 print "skipping      :", opt.skip
+print "governor      :", opt.governor
 print "hamlib        :", opt.hamlib
 print "hamlib rigtype:", opt.hamlib_rigtype
 print "hamlib device :", opt.hamlib_device
-if opt.source=="rtl":
+if opt.source in ("rtl", "rtl_tcp"):
+    if opt.source=="rtl_tcp":
+        print "rtl_tcp server:", opt.rtl_tcp
     print "rtl frequency :", opt.rtl_frequency
     print "rtl gain      :", opt.rtl_gain
 if opt.control=="si570":
     print "si570 frequency :", opt.si570_frequency
-print "pulse         :", opt.pulse
+print "pipeline      :", opt.pipeline
+print "dsp threads   :", opt.dsp_threads if opt.dsp_threads > 0 else "auto"
+print "overlap       :", opt.overlap
+print "pfb taps      :", opt.pfb_taps if opt.pfb_taps > 1 else "off"
+print "zoom          :", opt.zoom if opt.zoom > 0 else "off"
+print "averaging     :", "tc %g s (%s)" % (opt.avg_tc, opt.avg_mode) \
+                            if opt.avg_tc > 0 else "off"
+print "pulse         :", opt.pulse, "(blank %s)" % opt.blank
 print "fullscreen    :", opt.fullscreen
 print "hamlib intvl  :", opt.hamlib_interval
 print "cpu load intvl:", opt.cpu_load_interval
@@ -217,6 +237,49 @@ class Graticule(object):
         self.sp_min = sp_min
         return
 
+class Trace(object):
+    """ Draw a spectrum as a line graph on a surface w pixels wide and h
+        high.  If there are more data points than pixels, each pixel
+        column shows the min - max envelope of its bins, so narrow
+        carriers stay visible at any FFT size.
+        The x coordinates are computed once, here.
+    """
+    def __init__(self, nbins, w, h):
+        self.h = h
+        self.binmap = dsp.BinMap(nbins, w)
+        if self.binmap.decimate:
+            # Two points per column, ordered max,min then min,max, ...
+            self.pts = np.empty((2*w, 2))
+            self.pts[:,0] = np.repeat(np.arange(w), 2)
+            self.top = self.pts[0::4,1], self.pts[3::4,1]
+            self.bot = self.pts[1::4,1], self.pts[2::4,1]
+        else:
+            self.pts = np.empty((nbins, 2))
+            self.pts[:,0] = (np.arange(nbins) * w) / nbins
+        self.y = self.pts[:,1]
+        self.vmax = self.vmin = None
+
+    def draw(self, surface, sp_log, sp_min, yscale, color):
+        """ Draw sp_log (dB); sp_min is at bottom, yscale is pixels/dB.
+        """
+        if self.binmap.decimate:
+            if self.vmax is None or self.vmax.dtype != sp_log.dtype:
+                self.vmax = np.empty(self.binmap.npix, sp_log.dtype)
+                self.vmin = np.empty(self.binmap.npix, sp_log.dtype)
+            self.binmap.max(sp_log, self.vmax)
+            self.binmap.min(sp_log, self.vmin)
+            self.top[0][...] = self.vmax[0::2]
+            self.top[1][...] = self.vmax[1::2]
+            self.bot[0][...] = self.vmin[0::2]
+            self.bot[1][...] = self.vmin[1::2]
+        else:
+            self.y[...] = sp_log
+        # Scale to screen units and flip the y's.
+        self.y -= sp_min
+        self.y *= -yscale
+        self.y += self.h - 3.
+        pg.draw.lines(surface, color, False, self.pts.tolist(), 1)
+
 # THREAD: Hamlib, checking Rx frequency, and changing if requested.
 if opt.hamlib:
     import Hamlib
@@ -303,18 +366,25 @@ h_2d = 1*SCREEN_SIZE[1]/4 if opt.waterfall \
 h_2d -= 25 # compensate for LCD4 overscan?
 y_2d = 20. # y position of 2d disp. (screen top = 0)
 
-# NB: transform size must be <= w_spectra.  I.e., need at least one
-# pixel of width per data point.  Otherwise, waterfall won't work, etc.
-if opt.size > w_spectra:
-    for n in [2048,1024, 512, 256, 128]:
-        if n <= w_spectra:
-            print "*** Size was reset from %d to %d." % (opt.size, n)
-            opt.size = n    # Force size to be 2**k (ok, reasonable choice?)
-            break
+# NB: transform size may be larger than w_spectra.  Spectrum and waterfall
+# then show the envelope (peaks) of the bins that fall on each pixel.
+if opt.autotune:                # Choose size & buffers by benchmark
+    import iq_tune
+    iq_tune.autotune(opt, w_spectra)
 chunk_size = opt.buffers * opt.size # No. samples per chunk (pyaudio callback)
 chunk_time = float(chunk_size) / opt.sample_rate
 
-myDSP = dsp.DSP(opt)            # Establish DSP logic
+full_scale = iq_src.full_scale(opt)     # input level shown as 0 dB
+if not opt.pipeline:    # (else DSP runs in its own process, see below)
+    myDSP = dsp.DSP(opt, full_scale)    # Establish DSP logic
+
+myzoom = None
+if opt.zoom > 0:                # Zoomed sub-band view (iq_zoom)
+    import iq_zoom
+    myzoom = iq_zoom.Zoom(opt, chunk_size, opt.zoom, full_scale)
+
+# Spectrum line graph: bins to pixels
+sp_trace = Trace(opt.size, w_spectra, h_2d)
 
 # Surface for the 2d spectrum
 surf_2d = pg.Surface((w_spectra, h_2d))             # Initialized to black
@@ -328,7 +398,7 @@ led_clip = LED(10)
 h_wf = 3*SCREEN_SIZE[1]/4         # Height of waterfall (3d spectrum)
 y_wf = y_2d + h_2d              # Position just below 2d surface
 
-# Surface for waterfall (3d) spectrum
+# Surface for waterfall (3d) spectrum (circular store of lines, see iq_wf)
 surf_wf = pg.Surface((w_spectra, h_wf))
 
 pg.display.set_caption(opt.ident)       # Title for main window
@@ -342,7 +412,7 @@ smfont = pg.font.SysFont('mono', 9)
 smfont_ht = smfont.get_linesize()
 
 # Define the size of a unit pixel in the waterfall
-wf_pixel_size = (w_spectra/opt.size, h_wf/WF_LINES)
+wf_pixel_size = (max(1, w_spectra/opt.size), h_wf/WF_LINES)
 
 # min, max dB for wf palette
 v_min, v_max = opt.v_min, opt.v_max     # lower/higher end (dB)
@@ -399,24 +469,210 @@ parms_matter.blit(medfont.render(parms_msg, 1, TCOLOR2), (0,0))
 
 print "Update interval = %.2f ms" % float(1000*chunk_time)
 
-# Initialize input mode, RTL or AF
+# Initialize input mode, RTL or AF (iq_src), or with --PIPELINE start the
+# acquisition and DSP processes (iq_pipe).
 # This starts the input stream, so place it close to start of main loop.
-if opt.source=="rtl":             # input from RTL dongle (and freq control)
-    import iq_rtl as rtl
-    dataIn = rtl.RTL_In(opt)
-elif opt.source=='audio':         # input from audio card
-    import iq_af as af
-    mainqueueLock = af.queueLock    # queue and lock only for soundcard
-    dataIn = af.DataInput(opt)
+if opt.pipeline:
+    import iq_pipe
+    dataIn = iq_pipe.Pipeline(opt, full_scale)
+    myDSP = dataIn.dsp          # (hold traces and LED flag from DSP process)
 else:
-    print "unrecognized mode"
-    quit_all()
+    dataIn = iq_src.open_source(opt)
+if opt.source=='audio':
+    import iq_af as af          # (LED flags)
 
 if opt.control=="si570":
     import si570control
     mysi570 = si570control.Si570control()
     mysi570.setFreq(opt.si570_frequency / 1000.)    # Set starting freq.
 
+# Adaptive load governor (--GOVERNOR; else only measures the load)
+mygov = gov.Governor(opt, chunk_time, dataIn.queue_stats()[1])
+def governor_update():
+    """ Let the governor adjust the work load for the next frames.
+    """
+    if mygov.update(dataIn.queue_stats()[0]):
+        dataIn.set_skip(mygov.skip)     # (audio: read by pyaudio callback)
+
+def handle_events():
+    """ Act on pygame events - keyboard, etc.  Called every time through
+        the main loop, also for chunks that are not displayed.
+    """
+    global sp_min, sp_max, v_min, v_max, info_phase, info_counter
+    global surf_2d_graticule, rigfreq_request, freq
+    # Note: A key press is not recorded as a PyGame event if you are 
+    # connecting via SSH.  In that case, use --sp_min/max and --v_min/max
+    # command line options to set scales.
+
+    for event in pg.event.get():
+        if event.type == pg.QUIT:
+            quit_all()
+        elif event.type == pg.KEYDOWN:
+            if info_phase <= 1:         # Normal op. (0) or help phase 1 (1)
+                # We usually want left or right shift treated the same!
+                shifted = event.mod & (pg.KMOD_LSHIFT | pg.KMOD_RSHIFT)
+                if event.key == pg.K_q:
+                    quit_all()
+                elif event.key == pg.K_u:            # 'u' or 'U' - chg upper dB
+                    if shifted:                         # 'U' move up
+                        if sp_max < 0:
+                            sp_max += 10
+                    else:                               # 'u' move dn
+                        if sp_max > -130 and sp_max > sp_min + 10:
+                            sp_max -= 10
+                    mygraticule.set_range(sp_min, sp_max)
+                    surf_2d_graticule = mygraticule.make()
+                elif event.key == pg.K_l:            # 'l' or 'L' - chg lower dB
+                    if shifted:                         # 'L' move up lower dB
+                        if sp_min < sp_max -10:
+                            sp_min += 10
+                    else:                               # 'l' move down lower dB
+                        if sp_min > -140:
+                            sp_min -= 10
+                    mygraticule.set_range(sp_min, sp_max)
+                    surf_2d_graticule = mygraticule.make()   
+                elif event.key == pg.K_b:            # 'b' or 'B' - chg upper pal.
+                    if shifted:
+                        if v_max < -10:
+                            v_max += 10
+                    else:
+                        if v_max > v_min + 20:
+                            v_max -= 10
+                    mywf.set_range(v_min,v_max)
+                elif event.key == pg.K_d:            # 'd' or 'D' - chg lower pal.
+                    if shifted:
+                        if v_min < v_max - 20:
+                            v_min += 10
+                    else:
+                        if v_min > -130:
+                            v_min -= 10
+                    mywf.set_range(v_min,v_max)
+                elif event.key == pg.K_r:            # 'r' or 'R' = reset levels
+                    sp_min, sp_max = sp_min_def, sp_max_def
+                    mygraticule.set_range(sp_min, sp_max)
+                    surf_2d_graticule = mygraticule.make()
+                    if opt.waterfall:
+                        v_min, v_max = mywf.reset_range()
+
+                # Note that LCD peripheral buttons are Right, Left, Up, Down
+                # arrows and "Enter".  (Same as keyboard buttons)
+
+                elif event.key == pg.K_RIGHT:        # right arrow + freq
+                    if opt.control == 'rtl':
+                        finc = 100e3 if shifted else 10e3
+                        dataIn.rtl.center_freq = dataIn.rtl.get_center_freq()+finc
+                    elif opt.control == 'si570':
+                        finc = 1.0 if shifted else 0.1
+                        mysi570.setFreqByValue(mysi570.getFreqByValue() + finc*.001)
+                    elif opt.hamlib:
+                        finc = 1.0 if shifted else 0.1
+                        rigfreq_request = rigfreq + finc
+                    else:
+                        print "Rt arrow ignored, no Hamlib"
+                elif event.key == pg.K_LEFT:         # left arrow - freq
+                    if opt.control == 'rtl':
+                        finc = -100e3 if shifted else -10e3
+                        dataIn.rtl.center_freq = dataIn.rtl.get_center_freq()+finc
+                    elif opt.control == 'si570':
+                        finc = -1.0 if shifted else -0.1
+                        mysi570.setFreqByValue(mysi570.getFreqByValue() + finc*.001)
+                    elif opt.hamlib:
+                        finc = -1.0 if shifted else -0.1
+                        rigfreq_request = rigfreq + finc
+                    else:
+                        print "Lt arrow ignored, no Hamlib"
+                elif event.key == pg.K_UP:
+                    if myzoom:
+                        myzoom.zoom(+1)         # zoom in
+                    else:
+                        print "Up"
+                elif event.key == pg.K_DOWN:
+                    if myzoom:
+                        myzoom.zoom(-1)         # zoom out
+                    else:
+                        print "Down"
+                elif event.key == pg.K_RETURN:
+                    info_phase  += 1            # Jump to phase 1 or 2 overlay
+                    info_counter = 0            #   (next time)
+
+            # We can have an alternate set of keyboard (LCD button) responses
+            # for each "phase" of the on-screen help system.
+            
+            elif info_phase == 2:               # Listen for info phase 2 keys
+                # Showing 2d spectrum gain/offset adjustments
+                # Note: making graticule is moderately slow.  
+                # Do not repeat range changes too quickly!
+                if event.key == pg.K_UP:
+                    if sp_max < 0:
+                        sp_max += 10
+                    mygraticule.set_range(sp_min, sp_max)
+                    surf_2d_graticule = mygraticule.make()   
+                elif event.key == pg.K_DOWN:
+                    if sp_max > -130 and sp_max > sp_min + 10:
+                        sp_max -= 10
+                    mygraticule.set_range(sp_min, sp_max)
+                    surf_2d_graticule = mygraticule.make()   
+                elif event.key == pg.K_RIGHT:
+                    if sp_min < sp_max -10:
+                        sp_min += 10
+                    mygraticule.set_range(sp_min, sp_max)
+                    surf_2d_graticule = mygraticule.make()   
+                elif event.key == pg.K_LEFT:
+                    if sp_min > -140:
+                        sp_min -= 10
+                    mygraticule.set_range(sp_min, sp_max)
+                    surf_2d_graticule = mygraticule.make()   
+                elif event.key == pg.K_RETURN:
+                    info_phase = 3 if opt.waterfall \
+                            else 0              # Next is phase 3 unless no WF.
+                    info_counter = 0
+
+            elif info_phase == 3:               # Listen for info phase 3 keys
+                # Showing waterfall pallette adjustments
+                # Note: recalculating palette is quite slow.  
+                # Do not repeat range changes too quickly! (1 per second max?)
+                if event.key == pg.K_UP:
+                    if v_max < -10:
+                        v_max += 10
+                    mywf.set_range(v_min,v_max)
+                elif event.key == pg.K_DOWN:
+                    if v_max > v_min + 20:
+                        v_max -= 10
+                    mywf.set_range(v_min,v_max)
+                elif event.key == pg.K_RIGHT:
+                    if v_min < v_max - 20:
+                        v_min += 10
+                    mywf.set_range(v_min,v_max)
+                elif event.key == pg.K_LEFT:
+                    if v_min > -130:
+                        v_min -= 10
+                    mywf.set_range(v_min,v_max)
+                elif event.key == pg.K_RETURN:
+                    info_phase = 0                  # Turn OFF overlay
+                    info_counter = 0
+        elif event.type == pg.MOUSEMOTION:
+            pos = pg.mouse.get_pos()
+            y = (-2.*((pos[1]-y_wf) / h_wf) + 1.)
+            freq = y*float(opt.sample_rate/2.) 
+            print freq 
+            
+        elif event.type == pg.MOUSEBUTTONDOWN:
+            pos = pg.mouse.get_pos()
+            if myzoom:
+                # Center the zoomed view at the clicked frequency: x in
+                # the 2d spectrum, or the row in the waterfall.
+                if pos[1] < y_wf:
+                    fz = (pos[0] - x_spectra) / w_spectra - 0.5
+                else:
+                    fz = (pos[1] - y_wf) / h_wf - 0.5
+                myzoom.set_offset(fz * opt.sample_rate)
+                continue
+            y = (-2.*((pos[1]-y_wf) / h_wf) + 1.)
+            freq = y*float(opt.sample_rate/2.) 
+            print freq
+            rigfreq_request = freq/1000. +rigfreq
+    return
+
 # ** MAIN PROGRAM LOOP **
 
 run_flag = True                 # set false to suspend for help screen etc.
@@ -433,6 +689,33 @@ while True:
 
     nframe += 1                 # keep track of loop count FWIW
 
+    if opt.pipeline:
+        # Acquisition and DSP are done in their own processes.
+        sp_log = dataIn.ReadSpectrum()
+        mygov.start()                   # (time spent from here is load)
+        if opt.source=='audio' and dataIn.overran():
+            af.led_underrun_ct = 1      # chunks were dropped
+    else:
+        # Next chunk of complex I/Q from RTL-SDR dongle or audio card.
+        # (Audio: in its separate thread, a chunk of audio data has
+        # accumulated; we wait, timeout protected.)
+        iq_data_cmplx = dataIn.ReadChunk()
+        mygov.start()                   # (time spent from here is load)
+        sp_log = myDSP.GetLogPowerSpectrum(iq_data_cmplx)
+        if myzoom:
+            # (Pulses blanked as in the wide spectrum; keeps its last
+            # zoomed spectrum.)
+            myzoom.process(myDSP.Blanked(iq_data_cmplx))
+    stats = dataIn.stats                # max. I,Q values (audio)
+    re_d = dataIn.i_data                # I channel, for scope display
+
+    # The governor may average several chunks per displayed spectrum.
+    sp_log = mygov.spectrum(sp_log)
+    if sp_log is None:                  # Not time to display yet,
+        handle_events()                 # (but keep the controls live)
+        governor_update()
+        continue
+
     # Each time through the main loop, we reconstruct the main screen
 
     surf_main.fill(BGCOLOR)     # Erase with background color
@@ -454,6 +737,11 @@ while True:
     else:
         showfreq = False
 
+    if myzoom:
+        msg = "Zoom x%d at %+.2f kHz" % (myzoom.factor, myzoom.offset/1000.)
+        surf_main.blit(medfont.render(msg, 1, ORANGE, BGCOLOR),
+                            (x_spectra + w_spectra/4, y_2d-medfont_ht))
+
     if showfreq:
         # Center it and blit just above 2d display
         ww, hh = lgfont.size(msg)
@@ -482,64 +770,38 @@ while True:
         surf_main.blit(medfont.render(msg, 1, BLACK, BGCOLOR), (25, y_2d-hh))
         surf_main.blit(sled, (10, y_2d-hh))
 
-    if opt.source=='rtl':               # Input from RTL-SDR dongle
-        iq_data_cmplx = dataIn.ReadSamples(chunk_size)
-        if opt.rev_iq:                  # reverse spectrum?
-            iq_data_cmplx = np.imag(iq_data_cmplx)+1j*np.real(iq_data_cmplx)
-        #time.sleep(0.05)                # slow down if fast PC
-        stats = [ 0, 0]                 # for now...
-    else:                               # Input from audio card
-        # In its separate thread, a chunk of audio data has accumulated.
-        # When ready, pull log power spectrum data out of queue.
-        my_in_data_s = dataIn.get_queued_data() # timeout protected
-
-        # Convert string of 16-bit I,Q samples to complex floating
-        iq_local = np.fromstring(my_in_data_s,dtype=np.int16).astype('float32')
-        re_d = np.array(iq_local[1::2]) # right input (I)
-        im_d = np.array(iq_local[0::2]) # left  input (Q)
-
-        # The PCM290x chip has 1 lag offset of R wrt L channel. Fix, if needed.
-        if opt.lagfix:
-            im_d = np.roll(im_d, 1)
-        # Get some stats (max values) to monitor gain settings, etc.
-        stats = [int(np.amax(re_d)), int(np.amax(im_d))]
-        if opt.rev_iq:      # reverse spectrum?
-            iq_data_cmplx = np.array(im_d + re_d*1j)
-        else:               # normal spectrum
-            iq_data_cmplx = np.array(re_d + im_d*1j)
-    
-
-    sp_log = myDSP.GetLogPowerSpectrum(iq_data_cmplx)
-    if opt.source=='rtl':   # Boost rtl spectrum (arbitrary amount)
-        sp_log += 60        # RTL data were normalized to +/- 1.
-    
     yscale = float(h_2d)/(sp_max-sp_min)    # yscale is screen units per dB
     # Set the 2d surface to background/graticule.
     surf_2d.blit(surf_2d_graticule, (0, 0))
     
-    # Draw the "2d" spectrum graph
-    sp_scaled = ((sp_log - sp_min) * yscale) + 3.
-    ylist = list(sp_scaled)
-    ylist = [ h_2d - x for x in ylist ]                 # flip the y's
-    lylist = len(ylist)
-    xlist = [ x* w_spectra/lylist for x in xrange(lylist) ]
 
     if opt.scope: #AG1LE: added scope display to see the signal
         mysc.calculate(re_d,surf_2d,freq)
         surf_main.blit(surf_2d, (0, 0))    
         
     if opt.spectrum:
-        # Draw the spectrum based on our data lists.
-        pg.draw.lines(surf_2d, GREEN, False, zip(xlist,ylist), 1)
+        # Draw the "2d" spectrum graph, over the hold traces if any.
+        if myDSP.min_hold is not None:
+            sp_trace.draw(surf_2d, myDSP.min_hold, sp_min, yscale, BLUE)
+        if myDSP.peak_hold is not None:
+            sp_trace.draw(surf_2d, myDSP.peak_hold, sp_min, yscale, YELLOW)
+        sp_trace.draw(surf_2d, sp_log, sp_min, yscale, GREEN)
+        if myzoom and myzoom.sp_log is not None:
+            # Mark the zoomed band on the wide spectrum, then show the
+            # zoomed spectrum across the full width over it.
+            for f in (myzoom.offset - myzoom.rate/2, myzoom.offset + myzoom.rate/2):
+                xz = int(w_middle + f * w_spectra / opt.sample_rate)
+                pg.draw.line(surf_2d, GRAY, (xz, 0), (xz, h_2d), 1)
+            sp_trace.draw(surf_2d, myzoom.sp_log, sp_min, yscale, ORANGE)
 
         # Place 2d spectrum on main surface
         surf_main.blit(surf_2d, (x_spectra, y_2d))
 
     if opt.waterfall:
         # Calculate the new Waterfall line and blit it to main surface
-        nsum = opt.waterfall_accumulation    # 2d spectra per wf line
+        nsum = opt.waterfall_accumulation * mygov.wf_factor # 2d spectra per wf line
         mywf.calculate(sp_log, nsum, surf_wf)
-        surf_main.blit(surf_wf, (x_spectra, y_wf+1))
+        mywf.draw(surf_main, (x_spectra, y_wf+1))
         pg.display.update()
 
     if info_phase > 0:
@@ -572,6 +834,8 @@ while True:
                 if opt.control != "none":
                     lines.append("Change rcvr freq: (rt arrow) increase; (lt arrow) decrease")
                     lines.append("   Use SHIFT for bigger steps")
+                if myzoom:
+                    lines.append("Zoom: (up arrow) in; (dn arrow) out; click to center")
                 lines.append("RETURN - Cycle to next Help screen")
             elif info_phase == 2:
                 lines = [ "SPECTRUM ADJUSTMENTS:",
@@ -599,7 +863,7 @@ while True:
             
             # "Live" info is placed toward bottom of window...
             # Width of this surface is a guess. (It should be computed.)
-            live_surface = pg.Surface((430,48), 0)
+            live_surface = pg.Surface((430,64), 0)
             # give live sp_min, sp_max, v_min, v_max
             msg = "dB scale min= %d, max= %d" % (sp_min, sp_max)
             live_surface.blit(medfont.render(msg, 1, TCOLOR2), (10,0))
@@ -611,176 +875,30 @@ while True:
             if opt.source=='audio':
                 msg = "ADC max I:%05d; Q:%05d" % (stats[0], stats[1])
                 live_surface.blit(medfont.render(msg, 1, TCOLOR2), (10, 32))
+            if opt.pipeline:
+                msg = "Pipe I/Q %d drop %d; sp %d drop %d" % dataIn.pipe_stats()
+            elif opt.source=='audio':
+                msg = "Queue %d/%d; overruns %d" % dataIn.queue_stats()
+            else:
+                msg = "Queue %d/%d; gaps %d" % dataIn.queue_stats()
+            live_surface.blit(medfont.render(msg, 1, TCOLOR2), (10, 48))
             # Show the live cpu load information from cpu_usage thread.
             msg = "Load usr=%3.2f; sys=%3.2f; load avg=%.2f" % \
                 (cpu_usage[0], cpu_usage[1], cpu_usage[2])
             live_surface.blit(medfont.render(msg, 1, TCOLOR2), (200, 32))
+            live_surface.blit(medfont.render(mygov.status(), 1, TCOLOR2),
+                                (200, 48))
         # Blit newly formatted -- or old -- screen to main surface.
         if place_buttons:   # Do we have rt hand buttons to place?
             for ix, bb in enumerate(button_surfs):
                 surf_main.blit(bb, (449, button_vloc[ix]))
         surf_main.blit(help_matter, (20,20))
-        surf_main.blit(live_surface,(20,SCREEN_SIZE[1]-60))
-
-    # Check for pygame events - keyboard, etc.
-    # Note: A key press is not recorded as a PyGame event if you are 
-    # connecting via SSH.  In that case, use --sp_min/max and --v_min/max
-    # command line options to set scales.
-
-    for event in pg.event.get():
-        if event.type == pg.QUIT:
-            quit_all()
-        elif event.type == pg.KEYDOWN:
-            if info_phase <= 1:         # Normal op. (0) or help phase 1 (1)
-                # We usually want left or right shift treated the same!
-                shifted = event.mod & (pg.KMOD_LSHIFT | pg.KMOD_RSHIFT)
-                if event.key == pg.K_q:
-                    quit_all()
-                elif event.key == pg.K_u:            # 'u' or 'U' - chg upper dB
-                    if shifted:                         # 'U' move up
-                        if sp_max < 0:
-                            sp_max += 10
-                    else:                               # 'u' move dn
-                        if sp_max > -130 and sp_max > sp_min + 10:
-                            sp_max -= 10
-                    mygraticule.set_range(sp_min, sp_max)
-                    surf_2d_graticule = mygraticule.make()
-                elif event.key == pg.K_l:            # 'l' or 'L' - chg lower dB
-                    if shifted:                         # 'L' move up lower dB
-                        if sp_min < sp_max -10:
-                            sp_min += 10
-                    else:                               # 'l' move down lower dB
-                        if sp_min > -140:
-                            sp_min -= 10
-                    mygraticule.set_range(sp_min, sp_max)
-                    surf_2d_graticule = mygraticule.make()   
-                elif event.key == pg.K_b:            # 'b' or 'B' - chg upper pal.
-                    if shifted:
-                        if v_max < -10:
-                            v_max += 10
-                    else:
-                        if v_max > v_min + 20:
-                            v_max -= 10
-                    mywf.set_range(v_min,v_max)
-                elif event.key == pg.K_d:            # 'd' or 'D' - chg lower pal.
-                    if shifted:
-                        if v_min < v_max - 20:
-                            v_min += 10
-                    else:
-                        if v_min > -130:
-                            v_min -= 10
-                    mywf.set_range(v_min,v_max)
-                elif event.key == pg.K_r:            # 'r' or 'R' = reset levels
-                    sp_min, sp_max = sp_min_def, sp_max_def
-                    mygraticule.set_range(sp_min, sp_max)
-                    surf_2d_graticule = mygraticule.make()
-                    if opt.waterfall:
-                        v_min, v_max = mywf.reset_range()
+        surf_main.blit(live_surface,(20,SCREEN_SIZE[1]-76))
 
-                # Note that LCD peripheral buttons are Right, Left, Up, Down
-                # arrows and "Enter".  (Same as keyboard buttons)
-
-                elif event.key == pg.K_RIGHT:        # right arrow + freq
-                    if opt.control == 'rtl':
-                        finc = 100e3 if shifted else 10e3
-                        dataIn.rtl.center_freq = dataIn.rtl.get_center_freq()+finc
-                    elif opt.control == 'si570':
-                        finc = 1.0 if shifted else 0.1
-                        mysi570.setFreqByValue(mysi570.getFreqByValue() + finc*.001)
-                    elif opt.hamlib:
-                        finc = 1.0 if shifted else 0.1
-                        rigfreq_request = rigfreq + finc
-                    else:
-                        print "Rt arrow ignored, no Hamlib"
-                elif event.key == pg.K_LEFT:         # left arrow - freq
-                    if opt.control == 'rtl':
-                        finc = -100e3 if shifted else -10e3
-                        dataIn.rtl.center_freq = dataIn.rtl.get_center_freq()+finc
-                    elif opt.control == 'si570':
-                        finc = -1.0 if shifted else -0.1
-                        mysi570.setFreqByValue(mysi570.getFreqByValue() + finc*.001)
-                    elif opt.hamlib:
-                        finc = -1.0 if shifted else -0.1
-                        rigfreq_request = rigfreq + finc
-                    else:
-                        print "Lt arrow ignored, no Hamlib"
-                elif event.key == pg.K_UP:
-                    print "Up"
-                elif event.key == pg.K_DOWN:
-                    print "Down"
-                elif event.key == pg.K_RETURN:
-                    info_phase  += 1            # Jump to phase 1 or 2 overlay
-                    info_counter = 0            #   (next time)
-
-            # We can have an alternate set of keyboard (LCD button) responses
-            # for each "phase" of the on-screen help system.
-            
-            elif info_phase == 2:               # Listen for info phase 2 keys
-                # Showing 2d spectrum gain/offset adjustments
-                # Note: making graticule is moderately slow.  
-                # Do not repeat range changes too quickly!
-                if event.key == pg.K_UP:
-                    if sp_max < 0:
-                        sp_max += 10
-                    mygraticule.set_range(sp_min, sp_max)
-                    surf_2d_graticule = mygraticule.make()   
-                elif event.key == pg.K_DOWN:
-                    if sp_max > -130 and sp_max > sp_min + 10:
-                        sp_max -= 10
-                    mygraticule.set_range(sp_min, sp_max)
-                    surf_2d_graticule = mygraticule.make()   
-                elif event.key == pg.K_RIGHT:
-                    if sp_min < sp_max -10:
-                        sp_min += 10
-                    mygraticule.set_range(sp_min, sp_max)
-                    surf_2d_graticule = mygraticule.make()   
-                elif event.key == pg.K_LEFT:
-                    if sp_min > -140:
-                        sp_min -= 10
-                    mygraticule.set_range(sp_min, sp_max)
-                    surf_2d_graticule = mygraticule.make()   
-                elif event.key == pg.K_RETURN:
-                    info_phase = 3 if opt.waterfall \
-                            else 0              # Next is phase 3 unless no WF.
-                    info_counter = 0
-
-            elif info_phase == 3:               # Listen for info phase 3 keys
-                # Showing waterfall pallette adjustments
-                # Note: recalculating palette is quite slow.  
-                # Do not repeat range changes too quickly! (1 per second max?)
-                if event.key == pg.K_UP:
-                    if v_max < -10:
-                        v_max += 10
-                    mywf.set_range(v_min,v_max)
-                elif event.key == pg.K_DOWN:
-                    if v_max > v_min + 20:
-                        v_max -= 10
-                    mywf.set_range(v_min,v_max)
-                elif event.key == pg.K_RIGHT:
-                    if v_min < v_max - 20:
-                        v_min += 10
-                    mywf.set_range(v_min,v_max)
-                elif event.key == pg.K_LEFT:
-                    if v_min > -130:
-                        v_min -= 10
-                    mywf.set_range(v_min,v_max)
-                elif event.key == pg.K_RETURN:
-                    info_phase = 0                  # Turn OFF overlay
-                    info_counter = 0
-        elif event.type == pg.MOUSEMOTION:
-            pos = pg.mouse.get_pos()
-            y = (-2.*((pos[1]-y_wf) / h_wf) + 1.)
-            freq = y*float(opt.sample_rate/2.) 
-            print freq 
-            
-        elif event.type == pg.MOUSEBUTTONDOWN:
-            pos = pg.mouse.get_pos()
-            y = (-2.*((pos[1]-y_wf) / h_wf) + 1.)
-            freq = y*float(opt.sample_rate/2.) 
-            print freq
-            rigfreq_request = freq/1000. +rigfreq
+    handle_events()             # keyboard, mouse
     # Finally, update display for user
     pg.display.update()
+    governor_update()
 
     # End of main loop
 
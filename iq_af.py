@@ -25,10 +25,13 @@
 # 01-04-2014 Initial release (QST article)
 # 05-17-2014 timing improvements, esp for Raspberry Pi, etc.
 #    implement 'skip'
+# 10-17-2026 Ring buffer (iq_ring.py) replaces Queue; no exit on overrun
+# 10-17-2026 ReadChunk() etc., common input interface (see iq_src.py)
 
-import sys, time, threading
-import Queue
+import sys
+import numpy as np
 import pyaudio as pa
+import iq_ring, iq_conv, iq_dsp
 
 # CALLBACK ROUTINE
 # pyaudio callback routine is called when in_data buffer is ready.
@@ -47,13 +50,12 @@ import pyaudio as pa
 led_underrun_ct = 0             # buffer underrun LED 
 cbcount = 0
 MAXQUEUELEN = 32                # Don't use iq-opt for this?
-cbqueue = Queue.Queue(MAXQUEUELEN)  # will be queue to transmit af data
+cbring = None                   # will be ring buffer to transmit af data
 cbskip_ct = 0
-queueLock = threading.Lock()    # protect queue accesses
 cbfirst = 1                     # Skip this many buffers at start
 def pa_callback_iqin(in_data, f_c, time_info, status):
-    global cbcount, cbqueue, cbskip, cbskip_ct
-    global led_underrun_ct, queueLock, cbfirst
+    global cbcount, cbring, cbskip, cbskip_ct
+    global led_underrun_ct, cbfirst
     
     cbcount += 1
 
@@ -79,15 +81,10 @@ def pa_callback_iqin(in_data, f_c, time_info, status):
     if cbfirst > 0:
         cbfirst -= 1
         return (None, pa.paContinue)    # Toss out first N data
-    try:
-        queueLock.acquire()
-        cbqueue.put_nowait(in_data)     # queue should sync with main thread
-        queueLock.release()
-    except Queue.Full:
-        print "ERROR: Internal queue is filled.  Reconfigure to use less CPU."
-        print "\n\n (Ignore remaining errors!)"
-        #time.sleep(100)
-        sys.exit()
+    # Copy into the ring (main thread is woken up).  If the main thread
+    # has fallen behind and the ring is full, this buffer is dropped.
+    if not cbring.put(in_data):
+        led_underrun_ct = 1         # signal LED (ring overrun)
     return (None, pa.paContinue)    # Return to pyaudio.  All OK.
 # END OF CALLBACK ROUTINE
 
@@ -100,13 +97,21 @@ class DataInput(object):
         # Consult pyaudio documentation.
         self.audio = pa.PyAudio()   # generates lots of warnings.
         print
+        # Converts each chunk of 16-bit L,R samples to complex I/Q.
+        self.iqconv = iq_conv.IQConverter(opt, opt.buffers * opt.size)
+        self.stats = self.iqconv.stats  # max. I, Q values of last chunk
+        self.i_data = self.iqconv.i_out # I channel of last chunk
+        self.single = opt.single
+        self.raw_format = 'lr16'    # int16 L,R pairs (see iq_file)
         self.Restart(opt)
         return
         
     def Restart(self, opt):         # Maybe restart after error?
-        global cbqueue, cbskip
+        global cbring, cbskip
 
         cbskip = opt.skip
+        # One ring slot holds one chunk of 16-bit I,Q pairs.
+        cbring = iq_ring.RingBuffer(MAXQUEUELEN, 2 * opt.buffers * opt.size)
         print
         # set up stereo / 48K IQ input channel.  Stream will be started.
         if opt.index < 0:       # Find pyaudio's idea of default index
@@ -141,18 +146,33 @@ class DataInput(object):
         return
 
     def get_queued_data(self):
-        timeout = 40
-        while cbqueue.qsize() < 4:
-            timeout -= 1
-            if timeout <= 0: 
-                print "timeout waiting for queue to become non-empty!"
-                sys.exit()
-            time.sleep(.1)
-        queueLock.acquire()
-        data = cbqueue.get(True, 4.)    # Why addnl timeout set?
-        queueLock.release()
+        # Wait (not poll) for the next chunk.  Returns an int16 view of
+        # the ring slot, valid until the next call.
+        data = cbring.get(4.)
+        if data is None:
+            print "timeout waiting for queue to become non-empty!"
+            sys.exit()
         return data
 
+    def ReadChunk(self):
+        """ Return the next chunk as complex I/Q (REV, lagfix and the
+            max. I,Q stats are done by the converter).  The array is
+            reused by the next call.
+        """
+        self.raw = self.get_queued_data()
+        iq_data_cmplx = self.iqconv.convert(self.raw)
+        if self.single:
+            iq_dsp.check_dtype("I/Q conversion", iq_data_cmplx, np.complex64)
+        return iq_data_cmplx
+
+    def queue_stats(self):
+        # Ring occupancy, size and overrun count for the info display.
+        return cbring.occupancy(), cbring.nslots, cbring.overruns
+
+    def set_skip(self, skip):
+        global cbskip
+        cbskip = skip               # (read by pyaudio callback)
+
     def CPU_load(self):
         load = self.afiqstream.get_cpu_load()
         return load
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+
+# Program iq_conv.py - Convert raw input samples to complex I/Q.
+# Copyright (C) 2026 Mauri Niininen
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact the author by e-mail: ag1le@arrl.net
+#
+# Part of the iq.py program.
+
+# HISTORY
+# 10-17-2026 Initial version: 16-bit stereo (sound card) converter
+# 10-17-2026 ByteConverter: RTL 8-bit I,Q straight to complex64
+# 10-17-2026 FloatConverter: recorded float32 I,Q (generator)
+
+import numpy as np
+
+class IQConverter(object):
+    """ Convert interleaved 16-bit stereo samples (Q = left, I = right)
+        to complex I/Q, written into one persistent output array.
+        --REV swap, --LAGFIX and the I/Q peak stats are done in the
+        same pass, without full-chunk temporaries.
+    """
+    def __init__(self, opt, nframes, dtype=np.complex64):
+        self.out = np.zeros(nframes, dtype)
+        self.lagfix = opt.lagfix
+        # Where I and Q go in the output.  --REV swaps them.
+        if opt.rev_iq:
+            self.i_out, self.q_out = self.out.imag, self.out.real
+        else:
+            self.i_out, self.q_out = self.out.real, self.out.imag
+        self.q_last = 0             # last Q sample of previous chunk (lagfix)
+        self.stats = [0, 0]         # max. I, Q values of last chunk
+        return
+
+    def convert(self, raw):
+        """ raw: string/buffer of int16 L,R pairs (or an int16 array).
+            Returns the complex output array (overwritten by next call).
+        """
+        if isinstance(raw, np.ndarray):
+            lr = raw.reshape(-1, 2)
+        else:
+            lr = np.frombuffer(raw, dtype=np.int16).reshape(-1, 2)
+        i_in = lr[:,1]              # right input (I)
+        q_in = lr[:,0]              # left  input (Q)
+        self.i_out[...] = i_in      # (int16 -> float, written in place)
+        # The PCM290x chip has 1 lag offset of R wrt L channel.  Fix, if
+        # needed, by delaying Q one sample, carried over from last chunk.
+        if self.lagfix:
+            self.q_out[1:] = q_in[:-1]
+            self.q_out[0] = self.q_last
+            self.q_last = q_in[-1]
+        else:
+            self.q_out[...] = q_in
+        # Some stats (max values) to monitor gain settings, etc.
+        self.stats[0] = int(i_in.max())
+        self.stats[1] = int(q_in.max())
+        return self.out
+
+class ByteConverter(object):
+    """ Convert interleaved unsigned 8-bit I,Q samples (RTL dongle, offset
+        binary with 127.5 = zero) to complex64 in +/- 1.0, written into
+        one persistent output array.
+    """
+    def __init__(self, opt, nframes):
+        self.out = np.zeros(nframes, np.complex64)
+        self.pairs = self.out.view(np.float32).reshape(nframes, 2)  # (re, im)
+        self.swap = opt.rev_iq
+        if self.swap:
+            # --REV: each I,Q byte pair is one 16-bit word; copying the
+            # words into a big-endian buffer swaps the bytes to Q,I.
+            # (Much faster than reading the pairs through a reversed view.)
+            self.swapped = np.empty(nframes, '>u2')
+            self.swapped_iq = self.swapped.view(np.uint8).reshape(nframes, 2)
+        self.stats = [0, 0]         # (no ADC max. stats, for now)
+        return
+
+    def convert(self, raw):
+        """ raw: uint8 array (or string/buffer) of I,Q byte pairs.
+            Returns the complex output array (overwritten by next call).
+        """
+        if not isinstance(raw, np.ndarray):
+            raw = np.frombuffer(raw, dtype=np.uint8)
+        if self.swap:
+            self.swapped[...] = raw.view('<u2')
+            iq = self.swapped_iq            # Q,I: reversed spectrum
+        else:
+            iq = raw.reshape(-1, 2)
+        # uint8 -> float32 in the same pass as the offset, then scale in
+        # place: two passes, no temporaries.  (A 256 entry lookup table
+        # with np.take was 3x slower: numpy first converts the byte
+        # indices to a full size intp array.)
+        np.subtract(iq, np.float32(127.5), out=self.pairs)
+        self.pairs *= np.float32(1. / 127.5)
+        return self.out
+
+class FloatConverter(object):
+    """ Copy interleaved float32 I,Q samples (a recording of the signal
+        generator) into one persistent complex64 output array.  (A copy,
+        as with the other converters; --REV swaps I and Q in it.)
+    """
+    def __init__(self, opt, nframes):
+        self.out = np.zeros(nframes, np.complex64)
+        self.swap = opt.rev_iq
+        if self.swap:                   # --REV: I and Q trade places
+            self.i_out, self.q_out = self.out.imag, self.out.real
+        self.stats = [0, 0]
+        return
+
+    def convert(self, raw):
+        """ raw: float32 array (or string/buffer) of I,Q pairs.
+            Returns the complex output array (overwritten by next call).
+        """
+        if not isinstance(raw, np.ndarray):
+            raw = np.frombuffer(raw, dtype=np.float32)
+        iq = raw.view(np.complex64)
+        if self.swap:
+            self.i_out[...] = iq.real
+            self.q_out[...] = iq.imag
+        else:
+            self.out[...] = iq
+        return self.out
+
+if __name__ == '__main__':
+    print 'debug'
@@ -22,77 +22,417 @@
 
 # HISTORY
 # 01-04-2014 Initial Release
+# 10-17-2026 Batched FFT over the whole chunk, reusable work buffers
+# 10-17-2026 Selectable FFT backend (iq_fft.py)
+# 10-17-2026 --SINGLE: complex64/float32 processing
+# 10-17-2026 BinMap: peak-preserving bins to pixels mapping
+# 10-17-2026 Vectorized pulse (noise) blanker, running median noise level
+# 10-17-2026 --overlap: Welch overlapped segments as a strided view
+# 10-17-2026 Exponential averaging across chunks; peak & min hold traces
+# 10-17-2026 --pfb_taps: polyphase filter bank spectrum estimator
+# 10-17-2026 --dsp_threads: split a chunk's segments over worker threads
+# 10-17-2026 full_scale: 0 dB is a full scale input, for any source
+# 10-17-2026 Blank into a work buffer, the caller's chunk is left alone
+# 10-17-2026 Blanker: noise level per chunk, short pulses only, capped
+# 10-17-2026 --dsp_threads auto by default, CPUs shared with --fft_workers
 
-import math, time
+import math, multiprocessing, sys, time
+from multiprocessing.pool import ThreadPool
 import numpy as np
-import numpy.fft as fft
+from numpy.lib import stride_tricks
+import iq_fft
+
+BLANK_GUARD = 2         # also blank this many samples each side of a pulse
+BLANK_MAX = 0.1         # never blank more than this fraction of a chunk
+PULSE_MAX = 64          # samples; a longer excursion is a signal, not a pulse
+PULSE_EDGE = 0.1        # a pulse lasts while |z|**2 > this x threshold
+NOISE_SAMPLES = 256     # samples (evenly spaced) for the median noise level
+PARALLEL_MIN = 32768    # samples per chunk below which threads don't pay
+
+def check_dtype(stage, a, dtype):
+    """ In --SINGLE mode, make sure nothing was silently upcast.
+    """
+    if a.dtype != dtype:
+        raise TypeError("%s: expected %s data, got %s" %
+                        (stage, np.dtype(dtype).name, a.dtype.name))
+
+class BinMap(object):
+    """ Map nbins data points (e.g. FFT bins) onto npix pixels.
+        Bin b falls on pixel int(b*npix/nbins).  With more bins than
+        pixels, max() and min() give the envelope of the bins on each
+        pixel (so narrow carriers stay visible); otherwise each pixel
+        takes the last bin that starts on or before it.
+        Index arrays are computed once per geometry.
+    """
+    def __init__(self, nbins, npix):
+        self.nbins, self.npix = nbins, npix
+        b0 = (np.arange(nbins) * float(npix) / nbins).astype(np.intp)
+        self.decimate = nbins > npix
+        if self.decimate:           # first bin of each pixel
+            self.edges = np.searchsorted(b0, np.arange(npix))
+        else:                       # bin shown on each pixel
+            self.index = np.maximum(0,
+                        np.searchsorted(b0, np.arange(npix), 'right') - 1)
+
+    def max(self, data, out):
+        if self.decimate:
+            return np.maximum.reduceat(data, self.edges, out=out)
+        return np.take(data, self.index, out=out)
+
+    def min(self, data, out):
+        if self.decimate:
+            return np.minimum.reduceat(data, self.edges, out=out)
+        return np.take(data, self.index, out=out)
 
 class DSP(object):
-    def __init__(self, opt):
+    def __init__(self, opt, full_scale=2**15):
         self.opt = opt
         self.stats = list()
-        # This is dB output for full scale 16bit input = max signal.
-        self.db_adjust = 20. * math.log10(self.opt.size * 2**15)
+        # This is dB output for full scale input = max signal.  (16-bit
+        # audio samples by default; RTL samples are scaled to +/- 1.)
+        self.db_adjust = 20. * math.log10(self.opt.size * full_scale)
         self.rejected_count = 0
         self.led_clip_ct = 0
-        # Use "Hanning" window function
-        self.w = np.empty(self.opt.size)
-        for i in range(self.opt.size):
-            self.w[i] = 0.5 * (1. - math.cos((2*math.pi*i)/(self.opt.size-1)))
+        # Working precision: complex64/float32 with --SINGLE, else double.
+        if opt.single:
+            self.dtype, self.rdtype = np.dtype(np.complex64), np.dtype(np.float32)
+        else:
+            self.dtype, self.rdtype = np.dtype(np.complex128), np.dtype(np.float64)
+        # FFT backend (numpy, scipy or pyFFTW) per opt.fft_backend
+        self.fft = iq_fft.get_backend(opt)
+        if opt.single and self.fft.name == 'numpy':
+            print "Warning: numpy.fft computes in double precision.  For a"
+            print "   true --SINGLE chain use --fft_backend=scipy or fftw."
+        # Use "Hanning" window function, or with --pfb_taps=M a polyphase
+        # filter bank: each FFT input is the sum of M window-weighted
+        # blocks of size samples, M*size long in all.  This needs the last
+        # (M-1)*size samples of the previous chunk, kept in pfb_buf.
+        self.pfb_taps = max(1, opt.pfb_taps)
+        if self.pfb_taps > 1:
+            self.w = iq_fft.pfb_window(self.opt.size, self.pfb_taps,
+                                       self.rdtype)
+            self.pfb_buf = None
+        else:
+            self.w = iq_fft.hanning(self.opt.size, self.rdtype)
+        # Work buffers for the batched engine, allocated on first use and
+        # reused for every chunk of the same shape.
+        self.nseg = 0
+        # Worker threads (--dsp_threads, 0 = auto).  NumPy & FFT libraries
+        # release the GIL in the heavy loops, so threads can run the FFTs
+        # of different segments at the same time.  Auto shares the CPUs
+        # with the FFT library's own threads (--fft_workers), so the two
+        # together don't ask for more threads than there are CPUs.
+        self.workers = opt.dsp_threads
+        if self.workers <= 0:
+            self.workers = max(1, multiprocessing.cpu_count() /
+                                  self.fft.workers)
+        self.pool = None
+        # Gather indices that do the fftshift (0 freq. to center) while
+        # copying the averaged power into the output buffer.
+        self.shift_idx = np.fft.fftshift(np.arange(self.opt.size))
+        # Welch overlap: segments start every 'hop' samples.
+        if not 0. <= self.opt.overlap < 1.:
+            print "Invalid overlap %g, must be 0 <= overlap < 1." % \
+                    self.opt.overlap
+            sys.exit()
+        self.hop = max(1, int(round(self.opt.size * (1. - self.opt.overlap))))
+        # Exponential averaging across chunks (--avg_tc secs, 0 = off) and
+        # peak/min hold decay, per chunk.
+        chunk_time = float(self.opt.size * self.opt.buffers) / \
+                        self.opt.sample_rate
+        if self.opt.avg_tc > 0:
+            self.avg_alpha = 1. - math.exp(-chunk_time / self.opt.avg_tc)
+        else:
+            self.avg_alpha = 1.
+        self.hold_step = self.opt.hold_decay * chunk_time   # dB per chunk
+        self.sp_avg = None              # averaged spectrum (lin or log)
+        self.peak_hold = None           # (None unless --PEAK_HOLD)
+        self.min_hold = None            # (None unless --MIN_HOLD)
+        # Noise blanker state: median of |z|**2 in the last chunk, and work
+        # buffers.
+        self.noise_pwr = 0.
+        self.td_pwr = None
+        self.blanked = False            # (last chunk had pulses blanked)
+        return
+
+    def _alloc(self, nseg):
+        """ (Re)allocate the work buffers for nseg segments of opt.size.
+        """
+        size = self.opt.size
+        self.nseg = nseg
+        # Split the segments among the workers, or one part if serial
+        # (small chunks, where dispatch would cost more than it saves).
+        # Each part has its own FFT plan, which owns the part's windowed
+        # segments, and its own power sum.
+        nw = min(self.workers, nseg) if nseg*size >= PARALLEL_MIN else 1
+        if nw > 1 and self.pool is None:
+            self.pool = ThreadPool(self.workers)
+        rdtype = self.rdtype
+        self.parts = []
+        for i in range(nw):
+            lo, hi = nseg*i/nw, nseg*(i+1)/nw
+            plan = self.fft.plan((hi-lo, size), self.dtype, slot=i)
+            pwr = np.empty(2*size, rdtype)      # sum of re**2, im**2 pairs
+            self.parts.append((lo, hi, plan, pwr))
+        self.pwr_acc = self.parts[0][3]         # (all parts summed here)
+        self.power_spectrum = np.empty(size, rdtype)    # 0 freq. centered
+        self.log_power_spectrum = np.empty(size, rdtype)
+        return
+
+    def _segment_power(self, part):
+        """ Window, FFT and sum the power of segments lo:hi of the chunk
+            (self.td_segments) into the part's power sum.
+        """
+        lo, hi, plan, pwr = part
+        if self.pfb_taps > 1:
+            np.einsum('kmn,mn->kn', self.td_segments[lo:hi], self.w,
+                      out=plan.input)
+        else:
+            # Taper each buffer with the window.  (Written to the plan's
+            # buffer, so the caller's data are left alone.)
+            np.multiply(self.td_segments[lo:hi], self.w, out=plan.input)
+        fd_spectra = plan()
+        if self.opt.single:
+            if self.fft.name == 'numpy':    # numpy.fft is double only
+                fd_spectra = fd_spectra.astype(self.dtype)
+            check_dtype("FFT output", fd_spectra, self.dtype)
+        # Compute the real-valued squared magnitude (ie power) of all
+        # buffers and sum over the chunk.  Viewing complex as (re, im)
+        # pairs lets us square in place without temporaries.
+        fd_pairs = fd_spectra.view(fd_spectra.real.dtype)
+        np.square(fd_pairs, out=fd_pairs)
+        np.sum(fd_pairs, axis=0, out=pwr)
+        return
+
+    def Smooth(self, sp):
+        """ Exponential average of sp into self.sp_avg, in place.  sp is
+            used as scratch.  Returns the average.
+        """
+        if self.sp_avg is None or len(self.sp_avg) != len(sp):
+            self.sp_avg = sp.copy()         # start from the first spectrum
+            return self.sp_avg
+        sp -= self.sp_avg                   # avg += alpha * (sp - avg)
+        sp *= self.avg_alpha
+        self.sp_avg += sp
+        return self.sp_avg
+
+    def Hold(self, sp_log):
+        """ Update the peak and min hold traces (dB), which decay toward
+            the current spectrum by opt.hold_decay dB/sec.
+        """
+        if self.opt.peak_hold:
+            if self.peak_hold is None or len(self.peak_hold) != len(sp_log):
+                self.peak_hold = sp_log.copy()
+            self.peak_hold -= self.hold_step
+            np.maximum(self.peak_hold, sp_log, out=self.peak_hold)
+        if self.opt.min_hold:
+            if self.min_hold is None or len(self.min_hold) != len(sp_log):
+                self.min_hold = sp_log.copy()
+            self.min_hold += self.hold_step
+            np.minimum(self.min_hold, sp_log, out=self.min_hold)
         return
 
+    def Blank(self, data):
+        """ Noise blanker.  A "noise pulse" is a run of at most PULSE_MAX
+            samples that reaches a magnitude greater than opt.pulse times
+            the median magnitude.  Pulse samples (plus BLANK_GUARD each side) are set
+            to zero, or interpolated with --blank=interp.  Returns data if
+            nothing was blanked, else a blanked copy in a DSP work buffer
+            (the caller's data are left alone).
+        """
+        n = len(data)
+        if self.td_pwr is None or len(self.td_pwr) != n or \
+                self.td_pwr.dtype != data.real.dtype:
+            self.td_pwr = np.empty(n, data.real.dtype)
+            self.td_tmp = np.empty(n, data.real.dtype)
+            self.td_mask = np.empty(n, bool)
+            self.td_edge = np.empty(n, bool)
+            self.td_work = np.empty(n, data.dtype)  # blanked copy
+            self.td_step = max(1, n / NOISE_SAMPLES)
+            self.td_sub = np.empty(len(self.td_pwr[::self.td_step]),
+                                   data.real.dtype)
+        self.blanked = False
+        pwr, mask = self.td_pwr, self.td_mask
+        np.multiply(data.real, data.real, out=pwr)      # |z|**2, no sqrt
+        np.multiply(data.imag, data.imag, out=self.td_tmp)
+        pwr += self.td_tmp
+        # Median of |z|**2 in this chunk, from an evenly spaced subset and
+        # a partial sort, so the level follows a signal coming on at once.
+        sub = self.td_sub
+        sub[...] = pwr[::self.td_step]
+        k = len(sub) / 2
+        sub.partition(k)
+        self.noise_pwr = float(sub[k])
+        if not self.noise_pwr > 0.:
+            return data                 # (all zeros, nothing to blank)
+        threshold = self.opt.pulse**2 * self.noise_pwr
+        np.greater(pwr, threshold, out=mask)
+        if not mask.any():
+            return data
+        # Runs of samples over PULSE_EDGE x the threshold (so a signal
+        # near the threshold is one run, not many short ones).  Only short
+        # runs that reach the threshold are pulses; a longer one is a
+        # signal (a carrier coming on, a CW element).  A run at either end
+        # of the chunk may go on in the next (or came from the last) one,
+        # so it is taken for a signal, too.
+        hits = np.flatnonzero(mask)
+        np.greater(pwr, PULSE_EDGE * threshold, out=self.td_edge)
+        idx = np.flatnonzero(self.td_edge)
+        brk = np.flatnonzero(np.diff(idx) > 1)
+        start = idx[np.r_[0, brk+1]]
+        end = idx[np.r_[brk, len(idx)-1]] + 1
+        hit = np.bincount(np.searchsorted(start, hits, 'right') - 1,
+                          minlength=len(start)) > 0
+        pulse = hit & (end - start <= PULSE_MAX) & (start > 0) & (end < n)
+        if not pulse.any():
+            return data
+        # Widen each pulse by the guard samples.  So much blanking is not
+        # impulse noise: leave such a chunk alone.  (Also, a chunk is never
+        # blanked entirely, so the spectrum never is all zeros.)
+        start = np.maximum(start[pulse] - BLANK_GUARD, 0)
+        end = np.minimum(end[pulse] + BLANK_GUARD, n)
+        if np.sum(end - start) > BLANK_MAX * n:
+            return data
+        edges = np.zeros(n+1, np.intp)  # +1 at each start, -1 at each end
+        np.add.at(edges, start, 1)
+        np.add.at(edges, end, -1)
+        np.greater(np.cumsum(edges[:n]), 0, out=mask)
+        self.rejected_count += np.count_nonzero(    # buffers hit
+                        mask.reshape(-1, self.opt.size).any(axis=1))
+        self.led_clip_ct = 1       # flash a red light
+        out = self.td_work
+        out[...] = data
+        if self.opt.blank == "interp":
+            bad = np.flatnonzero(mask)
+            good = np.flatnonzero(~mask)
+            out.real[bad] = np.interp(bad, good, data.real[good])
+            out.imag[bad] = np.interp(bad, good, data.imag[good])
+        else:
+            out[mask] = 0
+        self.blanked = True
+        return out
+
+    def Blanked(self, data):
+        """ The last chunk given to GetLogPowerSpectrum (data) as the
+            spectrum saw it: data, or its blanked copy.  (For iq_zoom.)
+        """
+        if self.blanked:
+            return self.td_work[:len(data)]
+        return data
+
     def GetLogPowerSpectrum(self, data):
+        """ Return the log power spectrum (dB) averaged over all buffers
+            of the chunk 'data' (opt.buffers * opt.size complex samples),
+            overlapped by opt.overlap, and averaged over chunks with time
+            constant opt.avg_tc.
+            The returned array belongs to DSP and is overwritten by the
+            next call.  data are not modified.
+        """
         size = self.opt.size            # size of FFT in I,Q samples.
-        power_spectrum = np.zeros(size)
+        nbuf = self.opt.buffers
+        # (The strided views below do not check the length themselves.)
+        if len(data) < nbuf*size:
+            raise ValueError("DSP input: chunk of %d samples, need %d" %
+                             (len(data), nbuf*size))
 
         # Time-domain analysis: Often we have long normal signals interrupted
         # by huge wide-band pulses that degrade our power spectrum average.
-        # We find the "normal" signal level, by computing the median of the 
-        # absolute value.  We only do this for the first buffer of a chunk,
-        # using the median for the remaining buffers in the chunk. 
-        # A "noise pulse" is a signal level greater than some threshold
-        # times the median.  When such a pulse is found, we skip the current
-        # buffer.  It would be better to blank out just the pulse, but that
-        # would be more costly in CPU time.
-
-        # Find the median abs value of first buffer to use for this chunk.
-        td_median = np.median(np.abs(data[:size]))
-        # Calculate our current threshold relative to measured median.
-        td_threshold = self.opt.pulse * td_median
-        nbuf_taken = 0          # Actual number of buffers accumulated
-        for ic in range(self.opt.buffers):
-            td_segment = data[ic*size:(ic+1)*size]
-            td_max = np.amax(np.abs(td_segment))    # Do we have a noise pulse?
-            if  True: #td_max < td_threshold:               # No, get pwr spectrum etc.
-                # EXPERIMENTAL TAPER
-                td_segment *= self.w
-                fd_spectrum = fft.fft(td_segment)
-                # Frequency-domain:
-                # Rotate array to place 0 freq. in center.  (It was at left.)
-                fd_spectrum_rot = np.fft.fftshift(fd_spectrum)
-                
-                # Compute the real-valued squared magnitude (ie power) and 
-                # accumulate into pwr_acc.
-                # fastest way to sum |z|**2 ??
-                nbuf_taken += 1
-                power_spectrum = power_spectrum + \
-                        np.real(fd_spectrum_rot*fd_spectrum_rot.conj())
-            else:                                   # Yes, abort buffer.
-                self.rejected_count += 1
-                self.led_clip_ct = 1       # flash a red light
-                
-                #if DEBUG: print "REJECT! %d" % self.rejected_count
-        if nbuf_taken > 0:
-            power_spectrum = power_spectrum / nbuf_taken     # normalize the sum.
+        # Blank them (in a copy) before the FFT.
+        if self.opt.blank != "off":
+            data = self.Blank(data[:nbuf*size])
+
+        # View the chunk as a (segments, size) matrix - no copy - and do the
+        # whole chunk with single array operations.  With --overlap the
+        # segments start every hop samples (Welch), so the same chunk gives
+        # more (partly independent) spectra to average.
+        hop = self.hop
+        nseg = (nbuf*size - size) / hop + 1
+        if nseg != self.nseg:
+            self._alloc(nseg)
+        if self.opt.single:
+            check_dtype("DSP input", data, self.dtype)
+        if self.pfb_taps > 1:
+            # Polyphase filter bank: view history + chunk as (segments,
+            # taps, size); the weighted pre-sum over taps is done with the
+            # windowing.
+            M = self.pfb_taps
+            nhist = (M-1) * size
+            if self.pfb_buf is None or len(self.pfb_buf) != nhist+nbuf*size:
+                self.pfb_buf = np.zeros(nhist + nbuf*size, self.dtype)
+            buf = self.pfb_buf
+            buf[:nhist] = buf[nbuf*size:]
+            buf[nhist:] = data[:nbuf*size]
+            st = buf.strides[0]
+            self.td_segments = stride_tricks.as_strided(buf,
+                    shape=(nseg, M, size), strides=(st*hop, st*size, st))
         else:
-            power_spectrum = np.ones(size)             # if no good buffers!
+            self.td_segments = stride_tricks.as_strided(data,
+                    shape=(nseg, size),
+                    strides=(data.strides[0]*hop, data.strides[0]))
+        # Window, FFT and power of all segments, in parts if threaded,
+        # then reduce the partial power sums.
+        if len(self.parts) > 1:
+            self.pool.map(self._segment_power, self.parts)
+            for part in self.parts[1:]:
+                self.pwr_acc += part[3]
+        else:
+            self._segment_power(self.parts[0])
+        self.td_segments = None             # (don't keep the caller's data)
+        power_spectrum = self.power_spectrum
+        # Frequency-domain:
+        # Add re**2 + im**2 and rotate to place 0 freq. in center.
+        np.add(self.pwr_acc[0::2], self.pwr_acc[1::2], out=self.pwr_acc[0::2])
+        np.take(self.pwr_acc[0::2], self.shift_idx, out=power_spectrum)
+        power_spectrum /= nseg                          # normalize the sum.
         # AG1LE: remove midpoint 
         midpoint = self.opt.size/2
         #power_spectrum[midpoint-1]=1e-8
         power_spectrum[midpoint]=1e-8
         #power_spectrum[midpoint+1]=1e-8
+        average = self.avg_alpha < 1.
+        if average and self.opt.avg_mode == "lin":
+            power_spectrum = self.Smooth(power_spectrum)
         # Convert to dB. Note log(0) = "-inf" in Numpy. It can happen if ADC 
         # isn't working right. Numpy issues a warning.
-        log_power_spectrum = 10. * np.log10(power_spectrum)
-        return log_power_spectrum - self.db_adjust  # max poss. signal = 0 dB
+        log_power_spectrum = self.log_power_spectrum
+        np.log10(power_spectrum, out=log_power_spectrum)
+        log_power_spectrum *= 10.
+        log_power_spectrum -= self.db_adjust    # max poss. signal = 0 dB
+        if average and self.opt.avg_mode == "log":
+            log_power_spectrum = self.Smooth(log_power_spectrum)
+        self.Hold(log_power_spectrum)
+        return log_power_spectrum
 
+if __name__ == '__main__':
+    # Blanker check: noise, then a carrier stepping up 30 dB (all at once,
+    # then keyed like CW), with a short pulse every few chunks.  The pulses
+    # must be blanked, the carrier never.  (A pulse on top of a key down
+    # element, when the noise level is below the carrier, is one long run
+    # with it and is let through.)
+    import iq_opt
+    opt = iq_opt.opt
+    mydsp = DSP(opt, 1.)
+    n = opt.buffers * opt.size
+    rng = np.random.RandomState(1)
+    t = np.arange(n)
+    for k in range(40):
+        x = 1e-3 * (rng.standard_normal(n) + 1j * rng.standard_normal(n))
+        key = np.ones(n, int) if k < 25 else (t + k*n) / 300 % 2
+        if k >= 10:
+            x += key * 10**1.5 * 1e-3 * np.exp(0.3j * t)
+        pulse = k % 5 == 2
+        if pulse:
+            x[n/2:n/2+4] += 1.          # pulse, 50 dB over the noise
+        x = x.astype(mydsp.dtype)
+        x0 = x.copy()
+        sp = mydsp.GetLogPowerSpectrum(x)
+        assert (x == x0).all(), "chunk %d: caller's data changed" % k
+        assert np.isfinite(sp).all(), "chunk %d: bad spectrum" % k
+        nblank = np.count_nonzero(mydsp.td_mask) if mydsp.blanked else 0
+        on_key = key[n/2-1:n/2+5].any() and mydsp.noise_pwr < 1e-4
+        if pulse and not (k >= 25 and on_key):
+            assert 4 <= nblank <= 4 + 2*BLANK_GUARD, \
+                "chunk %d: pulse not blanked (%d)" % (k, nblank)
+        else:
+            assert nblank == 0, "chunk %d: %d samples blanked" % (k, nblank)
+    print "Blanker OK: %d buffers with pulses" % mydsp.rejected_count
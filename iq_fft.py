@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+
+# Program iq_fft.py - FFT backends and window / plan caches.
+# Copyright (C) 2026 Mauri Niininen
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact the author by e-mail: ag1le@arrl.net
+#
+# Part of the iq.py program.
+
+# HISTORY
+# 10-17-2026 Initial version: numpy, scipy and pyFFTW backends
+# 10-17-2026 Polyphase filter bank window
+# 10-17-2026 Plan slots, one per DSP worker thread
+# 10-17-2026 numpy backend: workers = 1 (for --dsp_threads auto)
+
+# Each backend hands out "plans".  A plan owns an input array of a fixed
+# (shape, dtype); the caller fills plan.input and calls plan() to get the
+# FFT along the last axis.  Plans are cached per backend, so the DSP can
+# ask for one on every chunk without cost.  Windows are cached here too.
+#
+# Backends:
+#   numpy - numpy.fft (always available, computes in double precision)
+#   scipy - scipy.fft with opt.fft_workers threads (or scipy.fftpack on
+#           older scipy, single thread)
+#   fftw  - pyFFTW builders with opt.fft_workers threads.  FFTW "wisdom"
+#           is kept in opt.fftw_wisdom so planning is fast after restarts.
+# If the requested package is missing we fall back to numpy.
+
+import os, sys, pickle
+import numpy as np
+
+_windows = dict()       # (size, dtype) -> window array
+def hanning(size, dtype=np.float64):
+    """ Return the (cached, read-only) "Hanning" window of length size.
+    """
+    key = (size, np.dtype(dtype))
+    w = _windows.get(key)
+    if w is None:
+        n = np.arange(size, dtype=np.float64)
+        w = (0.5 * (1. - np.cos((2*np.pi*n)/(size-1)))).astype(dtype)
+        w.flags.writeable = False
+        _windows[key] = w
+    return w
+
+def pfb_window(size, taps, dtype=np.float64):
+    """ Return the (cached, read-only) polyphase filter bank window, shape
+        (taps, size): a sinc low pass one bin wide, times a Hanning window,
+        over taps * size samples.  Scaled to the sum of the Hanning window
+        of length size, so tones show at the same dB level.
+    """
+    key = (size, taps, np.dtype(dtype))
+    w = _windows.get(key)
+    if w is None:
+        n = np.arange(taps*size, dtype=np.float64)
+        w = np.sinc((n - taps*size/2.) / size) * hanning(taps*size)
+        w *= hanning(size).sum() / w.sum()
+        w = w.reshape(taps, size).astype(dtype)
+        w.flags.writeable = False
+        _windows[key] = w
+    return w
+
+class NumpyPlan(object):
+    def __init__(self, shape, dtype):
+        self.input = np.empty(shape, dtype)
+    def __call__(self):
+        return np.fft.fft(self.input, axis=-1)
+
+class ScipyPlan(object):
+    def __init__(self, shape, dtype, sfft, workers):
+        self.input = np.empty(shape, dtype)
+        self.sfft = sfft
+        self.kwargs = dict(axis=-1, overwrite_x=True)
+        if workers > 1:
+            self.kwargs['workers'] = workers
+    def __call__(self):
+        return self.sfft.fft(self.input, **self.kwargs)
+
+class FFTWPlan(object):
+    def __init__(self, shape, dtype, pyfftw, workers):
+        self.fftw = pyfftw.builders.fft(pyfftw.empty_aligned(shape, dtype),
+                        axis=-1, overwrite_input=True, avoid_copy=True,
+                        threads=workers, planner_effort='FFTW_MEASURE')
+        self.input = self.fftw.input_array
+    def __call__(self):
+        return self.fftw()          # (returns the plan's own output array)
+
+class FFTBackend(object):
+    """ Base class: cache of plans keyed by (shape, dtype, slot).  Threads
+        working at the same time use different slots, so they never share
+        a plan's arrays.
+    """
+    name = 'none'
+    def __init__(self, opt):
+        self.opt = opt
+        self.workers = max(1, opt.fft_workers)
+        self.plans = dict()
+
+    def plan(self, shape, dtype, slot=0):
+        key = (tuple(shape), np.dtype(dtype), slot)
+        p = self.plans.get(key)
+        if p is None:
+            p = self.plans[key] = self.make_plan(tuple(shape), np.dtype(dtype))
+        return p
+
+class NumpyFFT(FFTBackend):
+    name = 'numpy'
+    def __init__(self, opt):
+        FFTBackend.__init__(self, opt)
+        self.workers = 1                # (numpy.fft is single threaded)
+    def make_plan(self, shape, dtype):
+        return NumpyPlan(shape, dtype)
+
+class ScipyFFT(FFTBackend):
+    name = 'scipy'
+    def __init__(self, opt):
+        FFTBackend.__init__(self, opt)
+        try:
+            import scipy.fft as sfft
+        except ImportError:             # scipy < 1.4
+            import scipy.fftpack as sfft
+            if self.workers > 1:
+                print "Warning: scipy.fftpack has no 'workers'; using 1."
+            self.workers = 1
+        self.sfft = sfft
+    def make_plan(self, shape, dtype):
+        return ScipyPlan(shape, dtype, self.sfft, self.workers)
+
+class FFTWFFT(FFTBackend):
+    name = 'fftw'
+    def __init__(self, opt):
+        FFTBackend.__init__(self, opt)
+        import pyfftw
+        import pyfftw.builders
+        self.pyfftw = pyfftw
+        self.wisdom_file = os.path.expanduser(opt.fftw_wisdom)
+        try:
+            with open(self.wisdom_file, 'rb') as f:
+                pyfftw.import_wisdom(pickle.load(f))
+        except (IOError, EOFError, ValueError, pickle.UnpicklingError):
+            pass                        # none yet, or unusable. Plan afresh.
+    def make_plan(self, shape, dtype):
+        p = FFTWPlan(shape, dtype, self.pyfftw, self.workers)
+        self.save_wisdom()              # keep new plans for next start
+        return p
+    def save_wisdom(self):
+        try:
+            with open(self.wisdom_file, 'wb') as f:
+                pickle.dump(self.pyfftw.export_wisdom(), f)
+        except IOError as e:
+            print "Warning: cannot save FFTW wisdom:", e
+
+BACKENDS = { 'numpy': NumpyFFT, 'scipy': ScipyFFT, 'fftw': FFTWFFT }
+
+def get_backend(opt):
+    """ Return an FFT backend instance as chosen by opt.fft_backend.
+    """
+    if opt.fft_backend not in BACKENDS:
+        print "Invalid FFT backend requested:", opt.fft_backend
+        print "Choose one of:", ", ".join(sorted(BACKENDS))
+        sys.exit()
+    try:
+        return BACKENDS[opt.fft_backend](opt)
+    except ImportError as e:
+        print "Warning: FFT backend '%s' unavailable (%s); using numpy." % \
+                (opt.fft_backend, e)
+        return NumpyFFT(opt)
+
+if __name__ == '__main__':
+    print 'debug'
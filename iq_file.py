@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+
+# Program iq_file.py - Record raw I/Q chunks to a file, and play them back.
+# Copyright (C) 2026 Mauri Niininen
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact the author by e-mail: ag1le@arrl.net
+#
+# Part of the iq.py program.
+
+# HISTORY
+# 10-17-2026 Initial version
+# 10-17-2026 Format 'cf32' (generator output); pacing by iq_src.Pacer
+# 10-17-2026 Recorder: writer thread ends on ring close(), no polling
+# 10-17-2026 i_data: the I channel also with --REV
+
+# File format: a HEADER_SIZE byte header, MAGIC followed by JSON metadata
+# (padded with blanks), then the raw samples exactly as the source read
+# them, chunk after chunk:
+#   format 'lr16' - sound card: int16 L,R pairs (L = Q, R = I)
+#   format 'cu8'  - RTL dongle: uint8 I,Q pairs (offset binary)
+#   format 'cf32' - signal generator: float32 I,Q pairs (+/- 1.0)
+# Playback converts them with the same code as live input, so --REV and
+# --LAGFIX work the same, and a recording is a repeatable test load.
+#
+# --record=FILE: a background thread writes the chunks, taking them from
+# an iq_ring.RingBuffer; if the disk can't keep up, chunks are dropped
+# (and counted), the display is never held up.
+# --source=file --file=FILE: the recording is memory mapped and served
+# one chunk at a time, in real time or, with --FAST, as fast as we can
+# take them.  At the end it starts over.
+
+import atexit, json, sys, threading, time
+import numpy as np
+import iq_ring, iq_conv, iq_src
+
+MAGIC = "IQPYREC1"
+HEADER_SIZE = 512
+REC_SLOTS = 16              # chunks waiting for the writer thread
+DTYPES = { 'lr16': np.int16, 'cu8': np.uint8, 'cf32': np.float32 }
+
+def read_header(fname):
+    """ Return the metadata dict of recording fname.
+    """
+    try:
+        with open(fname, 'rb') as f:
+            hdr = f.read(HEADER_SIZE)
+    except IOError as e:
+        print "Cannot open recording:", e
+        sys.exit()
+    if not hdr.startswith(MAGIC):
+        print "Not an iq.py recording:", fname
+        sys.exit()
+    meta = json.loads(hdr[len(MAGIC):].strip())
+    if meta.get('format') not in DTYPES:
+        print "Unknown sample format in recording:", meta.get('format')
+        sys.exit()
+    return meta
+
+def read_options(opt):
+    """ Take sample rate and format of the --file recording into opt.
+    """
+    meta = read_header(opt.file)
+    opt.sample_rate = meta['sample_rate']
+    opt.file_format = meta['format']
+    return meta
+
+class Recorder(object):
+    """ Write raw chunks to fname in a background thread.
+    """
+    def __init__(self, fname, meta):
+        hdr = MAGIC + json.dumps(meta, sort_keys=True)
+        if len(hdr) > HEADER_SIZE:
+            print "Recording metadata too long."
+            sys.exit()
+        try:
+            self.f = open(fname, 'wb')
+        except IOError as e:
+            print "Cannot open recording file:", e
+            sys.exit()
+        self.f.write(hdr.ljust(HEADER_SIZE))
+        self.ring = None                # (made for the first chunk)
+        self.running = True
+        self.writer = threading.Thread(target=self.write_loop)
+        self.writer.daemon = True
+        atexit.register(self.close)
+        return
+
+    def write(self, raw):
+        """ Queue a raw chunk (array) for writing.  Returns False if it had
+            to be dropped.
+        """
+        if self.ring is None:
+            self.ring = iq_ring.RingBuffer(REC_SLOTS, raw.size, raw.dtype)
+            self.writer.start()
+        return self.ring.put(raw)
+
+    def write_loop(self):
+        while True:
+            frame = self.ring.get()
+            if frame is None:           # closed, all written; done
+                return
+            frame.tofile(self.f)
+
+    def close(self):
+        """ Write out what is queued and close the file.
+        """
+        if not self.running:
+            return
+        self.running = False
+        if self.ring is not None:
+            self.ring.close()
+            self.writer.join()
+            if self.ring.overruns:
+                print "Recording: %d chunks dropped (disk too slow)" % \
+                        self.ring.overruns
+        self.f.close()
+
+class Recording(object):
+    """ Wraps a source: records each raw chunk it reads, and otherwise
+        behaves like the source.
+    """
+    def __init__(self, opt, src):
+        meta = dict(format=src.raw_format, sample_rate=opt.sample_rate,
+                    chunk_size=opt.buffers * opt.size, time=time.time(),
+                    source=opt.source)
+        rtl = getattr(src, 'rtl', None)
+        if rtl is not None:
+            meta['center_freq'] = rtl.get_center_freq()
+        self.src = src
+        self.recorder = Recorder(opt.record, meta)
+        print "Recording to", opt.record
+
+    def ReadChunk(self):
+        iq_data_cmplx = self.src.ReadChunk()
+        self.recorder.write(self.src.raw)
+        return iq_data_cmplx
+
+    def close(self):
+        self.recorder.close()
+
+    def __getattr__(self, name):
+        return getattr(self.src, name)  # (everything else from src)
+
+class FileSource(object):
+    """ Input source: play back a recording (--file), memory mapped.
+    """
+    def __init__(self, opt):
+        self.opt = opt
+        self.meta = read_header(opt.file)
+        self.raw_format = self.meta['format']
+        self.data = np.memmap(opt.file, dtype=DTYPES[self.raw_format],
+                              mode='r', offset=HEADER_SIZE)
+        self.chunk_size = opt.buffers * opt.size
+        self.nvals = 2 * self.chunk_size    # values (I and Q) per chunk
+        if len(self.data) < self.nvals:
+            print "Recording is shorter than one chunk."
+            sys.exit()
+        if self.raw_format == 'cu8':
+            self.conv = iq_conv.ByteConverter(opt, self.chunk_size)
+        elif self.raw_format == 'cf32':
+            self.conv = iq_conv.FloatConverter(opt, self.chunk_size)
+        else:
+            self.conv = iq_conv.IQConverter(opt, self.chunk_size)
+        self.stats = self.conv.stats
+        # I channel of last chunk (--REV: where the converter put I)
+        self.i_data = getattr(self.conv, 'i_out', self.conv.out.real)
+        self.pacer = iq_src.Pacer(opt, float(self.chunk_size) / opt.sample_rate)
+        self.pos = 0
+        return
+
+    def ReadChunk(self):
+        """ Return the next chunk of complex I/Q samples, at the recorded
+            sample rate unless --FAST.  (The array is reused.)
+        """
+        if self.pos + self.nvals > len(self.data):
+            self.pos = 0                    # end of recording: start over
+        self.raw = self.data[self.pos:self.pos+self.nvals]
+        self.pos += self.nvals
+        self.pacer.wait()
+        return self.conv.convert(self.raw)
+
+    def queue_stats(self):
+        return 0, 0, 0                      # (no input queue)
+
+    def set_skip(self, skip):
+        pass
+
+if __name__ == '__main__':
+    print 'debug'
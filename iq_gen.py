@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+
+# Program iq_gen.py - Synthetic I/Q signal generator input source.
+# Copyright (C) 2026 Mauri Niininen
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact the author by e-mail: ag1le@arrl.net
+#
+# Part of the iq.py program.
+
+# HISTORY
+# 10-17-2026 Initial version
+
+# --source=gen makes the I/Q input, at any --rate, so iq.py can run (and
+# be timed) without a sound card or dongle.  The signal is repeatable:
+#   --gen_carriers  CW carriers, "offset_hz:dB,..."
+#   --gen_morse     a carrier keyed with MORSE_TEXT, "offset_hz:dB:wpm"
+#   --gen_noise     complex gaussian noise, dB
+#   --gen_pulses    impulse bursts (for the blanker), "per_sec:dB"
+#   --gen_dc        DC offset (added to I and Q)
+#   --gen_iq        I/Q imbalance, "gain_dB:phase_deg"
+# Levels are dB relative to full scale (+/- 1.0).
+#
+# To keep the generator cheap, everything that can be is done once, at
+# startup, in tables of TABLE_SAMPLES (a whole number of chunks):
+# carrier frequencies are rounded to a whole number of cycles per table,
+# so the sum of the carriers (with DC and I/Q imbalance) repeats exactly
+# and each chunk just copies the next slice.  Noise is read from a longer
+# table at a random offset.  Morse keying changes state only every dot
+# time, so most chunks either add the keyed carrier's slice or skip it;
+# only a chunk with a key edge gets a per-sample envelope.  A chunk is a
+# copy, an add or two, and a few short pulse bursts.
+
+import math, sys
+import numpy as np
+import iq_src
+
+TABLE_SAMPLES = 2**16       # carrier tables, rounded up to whole chunks
+NOISE_SAMPLES = 2**18       # noise table (read at random offsets)
+PULSE_LEN = 16              # samples per impulse burst
+SEED = 1                    # the same signal every run
+MORSE_TEXT = "CQ CQ DE AG1LE AG1LE K  "
+MORSE = { 'A':'.-', 'C':'-.-.', 'D':'-..', 'E':'.', 'G':'--.', 'K':'-.-',
+          'L':'.-..', 'Q':'--.-', '1':'.----' }
+
+def parse_spec(name, spec, nvals):
+    """ Parse a comma separated list of nvals-tuples "a:b,c:d" of floats.
+    """
+    if not spec:
+        return []
+    items = []
+    for item in spec.split(','):
+        try:
+            vals = [float(v) for v in item.split(':')]
+        except ValueError:
+            vals = []
+        if len(vals) != nvals:
+            print "Bad --%s value: %s" % (name, item)
+            sys.exit()
+        items.append(vals)
+    return items
+
+def morse_keying(text):
+    """ Key state (1 = down) for each dot time of text, as an array.
+    """
+    key = []
+    for word in text.split(' '):
+        for ch in word:
+            for el in MORSE[ch]:
+                key += [1] * (1 if el == '.' else 3) + [0]  # element, gap
+            key += [0] * 2              # letter gap: 3 dots in all
+        key += [0] * 4                  # word gap: 7 dots in all
+    return np.array(key, np.float32)
+
+def amplitude(db):
+    return 10. ** (db / 20.)
+
+class GenSource(object):
+    """ Input source: synthetic signal (--source=gen), in real time or, with
+        --FAST, as fast as it is taken.
+    """
+    def __init__(self, opt):
+        self.opt = opt
+        self.chunk_size = n = opt.buffers * opt.size
+        self.rate = float(opt.sample_rate)
+        self.rng = np.random.RandomState(SEED)
+        self.nchunks = max(1, TABLE_SAMPLES / n)    # chunks per table
+        self.ntable = self.nchunks * n
+        t = np.arange(self.ntable)
+
+        # Carriers, DC and imbalance: one table that repeats.
+        sig = np.zeros(self.ntable, np.complex128)
+        for offset, db in parse_spec("gen_carriers", opt.gen_carriers, 2):
+            sig += amplitude(db) * self.tone(offset, t)
+        self.table = self.impair(sig, opt.gen_dc)
+
+        # Morse: its own carrier table, keyed per chunk.
+        self.morse = None
+        for offset, db, wpm in parse_spec("gen_morse", opt.gen_morse, 3)[:1]:
+            self.morse = self.impair(amplitude(db) * self.tone(offset, t), 0.)
+            self.dot = max(1, int(1.2 / wpm * self.rate))   # samples per dot
+            self.keying = morse_keying(MORSE_TEXT)
+            self.ramp = np.arange(n)
+            self.env = np.empty(n, np.float32)
+
+        # Noise: a longer table, so the repeat is not seen.
+        self.noise = None
+        if opt.gen_noise is not None:
+            nn = NOISE_SAMPLES + n
+            sigma = amplitude(opt.gen_noise) / math.sqrt(2.)
+            w = sigma * (self.rng.standard_normal(nn) +
+                         1j * self.rng.standard_normal(nn))
+            self.noise = self.impair(w, 0.)
+
+        # Impulse bursts: a short decaying ring.
+        self.pulse_rate = 0.
+        for per_sec, db in parse_spec("gen_pulses", opt.gen_pulses, 2)[:1]:
+            self.pulse_rate = per_sec * n / self.rate   # mean per chunk
+            k = np.arange(PULSE_LEN)
+            self.pulse = (amplitude(db) * np.exp(-k / 4.) *
+                          np.exp(1j * 2.1 * k)).astype(np.complex64)
+
+        self.out = np.empty(n, np.complex64)
+        self.tmp = np.empty(n, np.complex64)
+        self.i_data = self.out.real     # I channel of last chunk
+        self.raw = self.out             # (recorded as is)
+        self.raw_format = 'cf32'
+        self.stats = [0, 0]             # (no ADC max. stats)
+        self.ichunk = 0                 # chunks made
+        self.pacer = iq_src.Pacer(opt, n / self.rate)
+        return
+
+    def tone(self, offset, t):
+        """ exp(j w t) for the frequency nearest offset Hz that has a whole
+            number of cycles per table.
+        """
+        cycles = round(offset / self.rate * self.ntable)
+        return np.exp(2j * math.pi * cycles / self.ntable * t)
+
+    def impair(self, sig, dc):
+        """ Apply the I/Q imbalance and DC offset; complex64 for the tables.
+        """
+        gain_db, phase = parse_spec("gen_iq", self.opt.gen_iq, 2)[0]
+        if gain_db != 0. or phase != 0.:
+            # Q channel: gain error, and phase error (leaks some I in).
+            g, ph = amplitude(gain_db), math.radians(phase)
+            sig = sig.real + 1j * g * (sig.imag * math.cos(ph) +
+                                       sig.real * math.sin(ph))
+        if dc:
+            sig = sig + dc * (1 + 1j)
+        return sig.astype(np.complex64)
+
+    def ReadChunk(self):
+        """ Return the next chunk of complex I/Q samples.
+            (The array is reused.)
+        """
+        n, out = self.chunk_size, self.out
+        s = (self.ichunk % self.nchunks) * n
+        out[...] = self.table[s:s+n]
+        if self.noise is not None:
+            o = self.rng.randint(0, NOISE_SAMPLES)
+            out += self.noise[o:o+n]
+        if self.morse is not None:
+            self.add_morse(s)
+        if self.pulse_rate > 0:
+            for p in self.rng.randint(0, n - PULSE_LEN,
+                                      self.rng.poisson(self.pulse_rate)):
+                out[p:p+PULSE_LEN] += self.pulse
+        self.ichunk += 1
+        self.pacer.wait()
+        return out
+
+    def add_morse(self, s):
+        """ Add the keyed Morse carrier for the chunk at table offset s.
+        """
+        n, nkey = self.chunk_size, len(self.keying)
+        t0 = self.ichunk * n            # sample time of chunk start
+        d0, d1 = t0 / self.dot, (t0 + n - 1) / self.dot
+        key = self.keying[np.arange(d0, d1 + 1) % nkey]    # (dots in chunk)
+        if key.min() == key.max():
+            # No key edge in this chunk (the usual case): all on or off.
+            if key[0]:
+                self.out += self.morse[s:s+n]
+            return
+        # Key edge: envelope per sample.
+        dots = (t0 + self.ramp) / self.dot % nkey
+        np.take(self.keying, dots, out=self.env)
+        np.multiply(self.morse[s:s+n], self.env, out=self.tmp)
+        self.out += self.tmp
+
+    def queue_stats(self):
+        return 0, 0, 0                  # (no input queue)
+
+    def set_skip(self, skip):
+        pass
+
+if __name__ == '__main__':
+    print 'debug'
@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+
+# Program iq_gov.py - Adaptive load governor.
+# Copyright (C) 2026 Mauri Niininen
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact the author by e-mail: ag1le@arrl.net
+#
+# Part of the iq.py program.
+
+# HISTORY
+# 10-17-2026 Initial version
+# 10-17-2026 Opt-in (--GOVERNOR); average in linear power; load per kept chunk
+
+# The governor watches the input queue depth and the time the main loop
+# spends on each chunk (DSP + drawing), compared to the chunk time.  When
+# we fall behind it moves up one level, when there is plenty of time it
+# moves back down.  Each level trades display detail for CPU:
+#   - average more chunks per displayed spectrum (fewer redraws),
+#   - fewer waterfall lines (more spectra per line),
+#   - and, as a last resort, skip input buffers (as --skip does).
+# A --skip set by the user is kept as is; the governor only skips buffers
+# when --skip is 0.  The governor is off unless --GOVERNOR is given; when
+# off, only the load is measured (for the status line).
+
+import time
+import numpy as np
+
+# (chunks per displayed spectrum, waterfall line factor, skip) per level
+LEVELS = [ (1, 1, 0),
+           (2, 1, 0),
+           (2, 2, 0),
+           (4, 2, 0),
+           (4, 4, 0),
+           (4, 4, 2),       # drop every 3rd buffer
+           (4, 4, 1) ]      # drop every 2nd buffer
+
+LOAD_HIGH = 0.90            # move up if busy more than this ...
+LOAD_LOW = 0.55             # ... move down if busy less than this
+UP_FRAMES = 3               # consecutive frames needed to move up
+DOWN_SECS = 5.0             # secs of low load needed to move down
+
+def kept_fraction(skip):
+    """ Fraction of the input buffers used with --skip=skip (see iq_af).
+    """
+    if skip > 0:
+        return skip / (skip + 1.)       # discard every (skip+1)th
+    if skip < 0:
+        return 1. / (1 - skip)          # use every (1-skip)th
+    return 1.
+
+class Governor(object):
+    def __init__(self, opt, chunk_time, queue_len=0):
+        self.opt = opt
+        self.chunk_time = chunk_time
+        self.queue_high = max(2, queue_len / 4)     # 0 --> no queue info
+        self.enabled = opt.governor
+        self.level = 0
+        self.load = 0.              # smoothed busy time / chunk time
+        self.up_ct = 0
+        self.down_ct = 0
+        self.down_frames = max(1, int(DOWN_SECS / chunk_time))
+        self.sp_acc = None          # accumulated spectra (linear power)
+        # Only the sound card input drops buffers when told to skip.
+        self.can_skip = opt.source == "audio"
+        self.sp_n = 0
+        self.t_start = time.time()
+        self.set_level(0)
+        return
+
+    def set_level(self, level):
+        self.level = level
+        self.sp_avg, self.wf_factor, skip = LEVELS[level]
+        self.skip = self.opt.skip if self.opt.skip != 0 else skip
+        # With skipping, chunks come (and may take) this much longer.
+        self.period = self.chunk_time
+        if self.can_skip:
+            self.period /= kept_fraction(self.skip)
+        self.up_ct = self.down_ct = 0
+
+    def start(self):
+        """ Call when a new chunk has arrived (work starts).
+        """
+        self.t_start = time.time()
+
+    def spectrum(self, sp_log):
+        """ Accumulate a log spectrum.  Returns the average (of the power,
+            in dB) when it is time to display one (every sp_avg chunks),
+            otherwise None.
+        """
+        if self.sp_avg == 1:
+            self.sp_n = 0
+            return sp_log
+        if self.sp_acc is None or len(self.sp_acc) != len(sp_log):
+            self.sp_acc = np.zeros(len(sp_log), sp_log.dtype)
+            self.sp_lin = np.empty(len(sp_log), sp_log.dtype)
+            self.sp_n = 0
+        lin = self.sp_lin               # 10**(dB/10), in place
+        np.multiply(sp_log, 0.1, out=lin)
+        np.power(10., lin, out=lin)
+        if self.sp_n == 0:
+            self.sp_acc[:] = lin
+        else:
+            self.sp_acc += lin
+        self.sp_n += 1
+        if self.sp_n < self.sp_avg:
+            return None
+        self.sp_acc /= self.sp_n
+        np.log10(self.sp_acc, out=self.sp_acc)
+        self.sp_acc *= 10.
+        self.sp_n = 0
+        return self.sp_acc
+
+    def update(self, queue_depth=0):
+        """ Call at end of main loop, with the current input queue depth.
+            Returns True if the level changed.
+        """
+        busy = (time.time() - self.t_start) / self.period
+        self.load += 0.2 * (busy - self.load)
+        if not self.enabled:
+            return False
+        behind = self.load > LOAD_HIGH or queue_depth >= self.queue_high
+        if behind:
+            self.down_ct = 0
+            self.up_ct += 1
+            if self.up_ct >= UP_FRAMES and self.level < len(LEVELS)-1:
+                self.set_level(self.level + 1)
+                return True
+        elif self.load < LOAD_LOW and queue_depth <= 1:
+            self.up_ct = 0
+            self.down_ct += 1
+            if self.down_ct >= self.down_frames and self.level > 0:
+                self.set_level(self.level - 1)
+                return True
+        else:
+            self.up_ct = self.down_ct = 0
+        return False
+
+    def status(self):
+        """ One line of text for the info overlay.
+        """
+        if not self.enabled:
+            return "Governor off; load %.2f" % self.load
+        return "Gov. level %d: avg %d, wf x%d, skip %d; load %.2f" % \
+            (self.level, self.sp_avg, self.wf_factor, self.skip, self.load)
+
+if __name__ == '__main__':
+    print 'debug'
@@ -25,7 +25,7 @@
 # 05-05-2014 Changed options
 # 05-31-2014 Si570 control (vs RTL control vs None [af])
 
-import optparse
+import optparse, sys
 
 # This module handles command-line options.
 
@@ -37,8 +37,16 @@ import optparse
 op = optparse.OptionParser()
 
 # Boolean options / modes.
+op.add_option("--AUTOTUNE", action="store_true", dest="autotune",
+    help="Benchmark and choose FFT size & n_buffers for this machine.")
+op.add_option("--FAST", action="store_true", dest="fast",
+    help="Play back --file (or generate) as fast as possible, not in real time.")
 op.add_option("--FULLSCREEN", action="store_true", dest="fullscreen",
     help="Switch to full screen display.")
+op.add_option("--GOVERNOR", action="store_true", dest="governor",
+    help="Adaptive load governor: average, thin the waterfall, skip when behind.")
+op.add_option("--HEADLESS", action="store_true", dest="headless",
+    help="No display: send spectra to --sink (see iq_sink.py).")
 op.add_option("--HAMLIB", action="store_true", dest="hamlib",
     help="use Hamlib to monitor/control rig frequency.")
 op.add_option("--LAGFIX", action="store_true", dest="lagfix",
@@ -49,8 +57,16 @@ op.add_option("--RTL", action="store_true", dest="source_rtl",
     help="Set source to RTL-SDR")
 op.add_option("--SI570", action="store_true", dest="control_si570",
     help="Set freq control to Si570, not RTL or Hamlib")
+op.add_option("--MIN_HOLD", action="store_true", dest="min_hold",
+    help="Show min hold trace on spectrum display.")
+op.add_option("--PEAK_HOLD", action="store_true", dest="peak_hold",
+    help="Show peak hold trace on spectrum display.")
+op.add_option("--PIPELINE", action="store_true", dest="pipeline",
+    help="Run acquisition, DSP and display in separate processes.")
 op.add_option("--REV", action="store_true", dest="rev_iq",
     help="Reverse I & Q to reverse spectrum display")
+op.add_option("--SINGLE", action="store_true", dest="single",
+    help="Keep DSP chain in complex64/float32 (less memory traffic)")
 op.add_option("--WATERFALL", action="store_true", dest="waterfall",
     help="Use waterfall display.")
 op.add_option("--spectrum", action="store_true", dest="spectrum",
@@ -59,8 +75,36 @@ op.add_option("--scope", action="store_true", dest="scope",
     help="Use scope display.")
 
 # Options with a parameter.
+op.add_option("--avg_mode", action="store", type="choice", dest="avg_mode",
+    choices=["lin", "log"],
+    help="Average spectra in linear power (lin) or dB (log). Default lin.")
+op.add_option("--avg_tc", action="store", type="float", dest="avg_tc",
+    help="Time constant (secs) of spectrum averaging over chunks; 0 = off.")
+op.add_option("--blank", action="store", type="choice", dest="blank",
+    choices=["zero", "interp", "off"],
+    help="Noise blanker: zero or interp(olate) pulses, or off. Default zero.")
 op.add_option("--cpu_load_intvl", action="store", type="float", dest="cpu_load_interval",
     help="Seconds delay between CPU load calculations")
+op.add_option("--dsp_threads", action="store", type="int", dest="dsp_threads",
+    help="Threads sharing the FFTs of a chunk; 0 = auto (CPUs / fft_workers). Default 0.")
+op.add_option("--fft_backend", action="store", type="string", dest="fft_backend",
+    help="FFT library: numpy, scipy or fftw (pyFFTW).  Default numpy.")
+op.add_option("--fft_workers", action="store", type="int", dest="fft_workers",
+    help="Threads per FFT for scipy / fftw backends, default 1.")
+op.add_option("--fftw_wisdom", action="store", type="string", dest="fftw_wisdom",
+    help="File to keep FFTW wisdom (plans) between runs.")
+op.add_option("--gen_carriers", action="store", type="string", dest="gen_carriers",
+    help="Generator CW carriers, 'offset_hz:dB,...' (dB re full scale).")
+op.add_option("--gen_dc", action="store", type="float", dest="gen_dc",
+    help="Generator DC offset (fraction of full scale), default 0.")
+op.add_option("--gen_iq", action="store", type="string", dest="gen_iq",
+    help="Generator I/Q imbalance 'gain_dB:phase_deg', default 0:0.")
+op.add_option("--gen_morse", action="store", type="string", dest="gen_morse",
+    help="Generator Morse signal 'offset_hz:dB:wpm', or '' for none.")
+op.add_option("--gen_noise", action="store", type="float", dest="gen_noise",
+    help="Generator noise level, dB re full scale.  Default -40.")
+op.add_option("--gen_pulses", action="store", type="string", dest="gen_pulses",
+    help="Generator impulse bursts 'per_sec:dB', or '' for none.")
 op.add_option("--rate", action="store", type="int", dest="sample_rate",
     help="sample rate (Hz), eg 48000, 96000, or 1024000 or 2048000 (for rtl)")
 op.add_option("--hamlib_device", action="store", type="string", dest="hamlib_device",
@@ -70,6 +114,10 @@ op.add_option("--hamlib_intvl", action="store", type="float", dest="hamlib_inter
 op.add_option("--hamlib_rig", action="store", type="int", dest="hamlib_rigtype",
     help="Hamlib rig type (int).  Run 'rigctl --list' for possibilities.  Default "
     "is 229 (Elecraft K3/KX3).")
+op.add_option("--file", action="store", type="string", dest="file",
+    help="Recording to play back with --source=file.")
+op.add_option("--hold_decay", action="store", type="float", dest="hold_decay",
+    help="Peak/min hold decay in dB/sec, default 10.")
 op.add_option("--index", action="store", type="int", dest="index",
     help="index of audio input card. Use pa.py to examine choices.  Index -1 " \
         "selects default input device.")
@@ -77,22 +125,45 @@ op.add_option("--lcd4_brightness", action="store", type="int", dest="lcd4_bright
     help="LCD4 display brightness 0 - 100")
 op.add_option("--n_buffers", action="store", type="int", dest="buffers",
     help="Number of FFT buffers in 'chunk', default 12")
+op.add_option("--overlap", action="store", type="float", dest="overlap",
+    help="FFT segment overlap fraction (0.5, 0.75, ...), default 0.")
+op.add_option("--pfb_taps", action="store", type="int", dest="pfb_taps",
+    help="Polyphase filter bank taps per bin (e.g. 4); 0 = Hanning FFT.")
 op.add_option("--pulse_clip", action="store", type="int", dest="pulse",
-    help="pulse clipping threshold, default 10.")
+    help="pulse (noise blanker) threshold x median, default 10.")
+op.add_option("--record", action="store", type="string", dest="record",
+    help="Record the raw input to this file (play back with --source=file).")
 op.add_option("--rtl_freq", action="store", type="float", dest="rtl_frequency",
     help="Initial RTL operating frequency (float kHz)")
+op.add_option("--rtl_tcp", action="store", type="string", dest="rtl_tcp",
+    help="rtl_tcp server HOST:PORT for --source=rtl_tcp, default localhost:1234.")
 op.add_option("--rtl_gain", action="store", type="int", dest="rtl_gain",
     help="RTL_SDR gain, default 0.")
+op.add_option("--source", action="store", type="choice", dest="source",
+    choices=["audio", "rtl", "rtl_tcp", "file", "gen"],
+    help="Input: audio (default), rtl (same as --RTL), rtl_tcp (see " \
+        "--rtl_tcp), file (see --file) or gen (signal generator, see --gen_...).")
 op.add_option("--si570_frequency", action="store", type="float", dest="si570_frequency",
     help="Si570 LO initial frequency, (float kHz)")
+op.add_option("--sink", action="store", type="string", dest="sink",
+    help="--HEADLESS output: stdout, file:PATH, unix:PATH, tcp:HOST:PORT, " \
+        "udp:HOST:PORT or serve:[HOST:]PORT (row server).  Default stdout.")
+op.add_option("--sink_format", action="store", type="choice", dest="sink_format",
+    choices=["f32", "u8"],
+    help="--HEADLESS spectrum frames: f32 (float dB) or u8 (dB from " \
+        "sp_min to sp_max in 0..255).  Default u8.")
 op.add_option("--size", action="store", type="int", dest="size",
     help="size of FFT.  Default is 512.")
 op.add_option("--skip", action="store", type="int", dest="skip",
-    help="Skipping input data parameter >= 0")
+    help="Skipping input data parameter (fixed; if 0, --GOVERNOR may skip)")
 op.add_option("--sp_min", action="store", type="int", dest="sp_min",
     help="spectrum level, low end, dB")
 op.add_option("--sp_max", action="store", type="int", dest="sp_max",
     help="spectrum level, hi end, dB")
+op.add_option("--tune_file", action="store", type="string", dest="tune_file",
+    help="File to keep autotune results, per host.")
+op.add_option("--tune_latency", action="store", type="float", dest="tune_latency",
+    help="Autotune max. chunk time (secs), default 0 = as set by size, n_buffers")
 op.add_option("--v_min", action="store", type="int", dest="v_min",
     help="palette level, low end, dB")
 op.add_option("--v_max", action="store", type="int", dest="v_max",
@@ -100,47 +171,90 @@ op.add_option("--v_max", action="store", type="int", dest="v_max",
 
 op.add_option("--waterfall_acc", action="store", type="int", dest="waterfall_accumulation",
     help="No. of spectra per waterfall line")
+op.add_option("--waterfall_cmap", action="store", type="string", dest="waterfall_cmap",
+    help="Waterfall colormap file, 'r g b' per line (overrides palette)")
 op.add_option("--waterfall_palette", action="store", type="int", dest="waterfall_palette",
     help="Waterfall color palette (1 or 2)")
+op.add_option("--zoom", action="store", type="int", dest="zoom",
+    help="Zoom factor (power of 2) for the zoomed sub-band view; 0 = off.")
 
 # The following are the default values which are used if not specified in the
 # command line.  You may want to edit them to be close to your normal operating needs.
 DEF_SAMPLE_RATE = 48000
 op.set_defaults(
+    autotune                = False,    # benchmark size & buffers at startup
+    avg_mode                = "lin",    # average in linear power or dB
+    avg_tc                  = 0.,       # averaging time constant, secs
     buffers                 = 4,       # no. buffers 2 in sample chunk (RPi-40)
+    blank                   = "zero",   # noise blanker mode
     control_si570           = False,    # normally, talk to RTL or Hamlib for freq info
     cpu_load_interval       = 3.0,      # cycle time for CPU monitor thread
+    dsp_threads             = 0,        # DSP worker threads (0 = auto)
+    fast                    = False,    # play back --file in real time
+    fft_backend             = "numpy",  # FFT library (numpy, scipy, fftw)
+    fft_workers             = 1,        # threads per FFT (scipy, fftw)
+    fftw_wisdom             = "~/.iq_fftw_wisdom",  # saved FFTW plans
+    file                    = None,     # recording to play back
     fullscreen              = False,    # Use full screen mode? (if not LCD4)
+    gen_carriers            = "3000:-20,-9000:-35",  # generator carriers
+    gen_dc                  = 0.,       # generator DC offset
+    gen_iq                  = "0:0",    # generator I/Q gain, phase error
+    gen_morse               = "-4000:-25:20",   # generator Morse signal
+    gen_noise               = -40.,     # generator noise, dB
+    gen_pulses              = "",       # generator impulse bursts
+    governor                = False,    # adapt work load when behind
     hamlib                  = True,    # Using Hamlib? T/F (RPi-False)
     hamlib_device           = "/dev/serial/by-id/usb-FTDI_FT232R_USB_UART_A9015X78-if00-port0", #"/dev/ttyUSB0",   # Device address for Hamlib I/O
     hamlib_interval         = 1.0,      # Wait between hamlib freq. checks (secs)    
     hamlib_rigtype          = 229,      # Elecraft K3/KX3.
+    headless                = False,    # no display, spectra to sink
+    hold_decay              = 10.,      # peak/min hold decay, dB/sec
     index                   = 0,       # index of audio device 0 (-1 use default)
     lagfix                  = False,    # Fix up PCM 290x bug
     lcd4                    = False,    # default large screen
     lcd4_brightness         = 75,       # brightness 0 - 100
+    min_hold                = False,    # min hold trace
+    overlap                 = 0.,       # Welch segment overlap fraction
+    peak_hold               = False,    # peak hold trace
+    pfb_taps                = 0,        # polyphase filter bank (0 = off)
+    pipeline                = False,    # multi-process pipeline
     pulse                   = 10,       # pulse clip threshold
+    record                  = None,     # record raw input to this file
     rev_iq                  = False,    # Reverse I & Q
     rtl_frequency           = 146.e6,   # RTL center freq. Hz
     rtl_gain                = 0,        # auto
+    rtl_tcp                 = "localhost:1234", # rtl_tcp server
     sample_rate             = DEF_SAMPLE_RATE,    # (stereo) frames/second (Hz)
     scope                   = False,    # use scope display 
     si570_frequency         = 7050.0,   # initial freq. for Si570 LO.
+    single                  = False,    # complex64/float32 DSP chain
+    sink                    = "stdout", # headless spectra go to ...
+    sink_format             = "u8",     # ... as uint8 (or float32) frames
     size                    = 256,      # size of FFT --> freq. resolution
     skip                    = 0,        # if not =0, skip some input data
+    source                  = None,     # audio, rtl, file or gen (see below)
     source_rtl              = False,    # Use sound card, not RTL-SDR input
     spectrum                = False,    # Use spectrum display 
     sp_min                  =-40,      # dB relative to clipping, at bottom of grid
     sp_max                  =-10,       # dB relative to clipping, at top of grid
+    tune_file               = "~/.iq_tune.json",   # autotune results
+    tune_latency            = 0.,       # autotune latency target (0 = current)
     v_min                   =-40,      # palette starts at this level
     v_max                   =-10,       # palette ends at this level
     waterfall               = True,    # Using waterfall? T/F
     waterfall_accumulation  = 1,        # No. of spectra per waterfall line = 2
-    waterfall_palette       = 2         # choose a waterfall color scheme
+    waterfall_cmap          = None,     # user colormap table file
+    waterfall_palette       = 2,        # choose a waterfall color scheme
+    zoom                    = 0         # zoom factor (0 = no zoomed view)
     )
 
 opt, args = op.parse_args()
 
+# --HEADLESS --sink=stdout: stdout carries the spectrum frames (iq_sink),
+# so from here on all messages go to stderr.
+if opt.headless and opt.sink == "stdout":
+    sys.stdout = sys.stderr
+
 # This is an "option" that the user can't change.
 opt.ident = "IQ.PY v. 0.3.6 de AA6E"
 
@@ -150,19 +264,38 @@ opt.ident = "IQ.PY v. 0.3.6 de AA6E"
 opt.control = "none"
 if opt.hamlib:
     opt.control = "hamlib"
-if opt.source_rtl:
+if opt.source_rtl:              # --RTL is short for --source=rtl
     opt.source = "rtl"
-    opt.control= "rtl"
-else:
+elif opt.source is None:
     opt.source = "audio"
-    if opt.control_si570:
-        opt.control = "si570"
+if opt.source in ("rtl", "rtl_tcp"):   # (dongle, local or remote)
+    opt.control= "rtl"
+elif opt.source == "audio" and opt.control_si570:
+    opt.control = "si570"
 
 # Change default Freq for RTL to an appropriate (legal) value (tnx KF3EB)
 # However, do not override user's --rate setting, if present.
-if opt.source_rtl and (opt.sample_rate == DEF_SAMPLE_RATE):
+if opt.source in ("rtl", "rtl_tcp") and (opt.sample_rate == DEF_SAMPLE_RATE):
     opt.sample_rate = 1024000
 
+# Playback: sample rate and format come from the recording.
+if opt.source == "file":
+    if not opt.file:
+        print "--source=file needs --file=<recording>"
+        sys.exit()
+    import iq_file
+    iq_file.read_options(opt)
+
+# The zoom view and the scope need the I/Q data in the display process.
+if opt.pipeline and (opt.zoom > 0 or opt.scope):
+    print "Warning: --zoom and --scope are not available with --PIPELINE."
+    opt.zoom, opt.scope = 0, False
+
+# No display, no display-only features.
+if opt.headless and (opt.zoom > 0 or opt.scope):
+    print "Warning: --zoom and --scope are not available with --HEADLESS."
+    opt.zoom, opt.scope = 0, False
+
 # Main module will use: options.opt to pick up this 'opt' instance.
 
 if __name__ == '__main__':
@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+
+# Program iq_pipe.py - Acquisition / DSP / render pipeline in processes.
+# Copyright (C) 2026 Mauri Niininen
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact the author by e-mail: ag1le@arrl.net
+#
+# Part of the iq.py program.
+
+# HISTORY
+# 10-17-2026 Initial version
+
+# With --PIPELINE the work of the main loop is split over three processes,
+# so each stage can use its own core:
+#
+#   acquisition --(I/Q chunks)--> DSP --(spectra)--> main (render)
+#
+# The stages are linked by SharedRing's: fixed slots in shared memory
+# (no pickling or copying through pipes), like iq_ring.RingBuffer.  A
+# stage that finds the next ring full drops its output and counts it
+# (back-pressure: a slow stage never blocks the one before it).
+# Frequency and --skip changes go from main to acquisition by a control
+# queue; the RTL center freq. comes back in shared memory.
+# The zoom view and the scope need the I/Q data in the main process, so
+# they are not available in this mode.
+
+import Queue, signal, sys
+import multiprocessing as mp
+import numpy as np
+import iq_dsp as dsp
+import iq_src
+
+IQ_SLOTS = 8                # I/Q chunks between acquisition and DSP
+SP_SLOTS = 4                # spectra between DSP and main
+
+class SharedRing(object):
+    """ Ring of nslots arrays of shape, dtype in shared memory, for one
+        producer and one consumer process.  Same use as iq_ring.RingBuffer.
+    """
+    def __init__(self, nslots, shape, dtype):
+        self.nslots = nslots
+        dtype = np.dtype(dtype)
+        nbytes = nslots * int(np.prod(shape)) * dtype.itemsize
+        self.raw = mp.RawArray('b', nbytes)
+        self.frames = np.frombuffer(self.raw, dtype).reshape((nslots,)+shape)
+        self.head = mp.RawValue('l', 0)     # frames written (producer only)
+        self.tail = mp.RawValue('l', 0)     # frames released (consumer only)
+        self.items = mp.Semaphore(0)        # frames ready for consumer
+        self.over = mp.RawValue('l', 0)     # frames dropped, ring full
+        self.held = False                   # (consumer's own)
+        return
+
+    def put(self, data):
+        """ Producer: copy data into the next slot.  Return False if the
+            ring is full (frame dropped).
+        """
+        head = self.head.value
+        if head - self.tail.value >= self.nslots:
+            self.over.value += 1
+            return False
+        self.frames[head % self.nslots] = data
+        self.head.value = head + 1
+        self.items.release()                # (semaphore: memory barrier too)
+        return True
+
+    def get(self, timeout=None):
+        """ Consumer: release the previous frame, wait for the next one.
+            Returns a view of the frame, or None after timeout (secs).
+        """
+        if self.held:
+            self.tail.value += 1
+            self.held = False
+        if not self.items.acquire(True, timeout):
+            return None
+        self.held = True
+        return self.frames[self.tail.value % self.nslots]
+
+    def occupancy(self):
+        return self.head.value - self.tail.value
+
+    @property
+    def overruns(self):
+        return self.over.value
+
+def acquire(opt, ring, ctl, freq, stats):
+    """ Acquisition process: read chunks from the source into ring.
+    """
+    # On terminate (main ends), exit cleanly so a recording is closed.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit())
+    src = iq_src.open_source(opt)
+    rtl = getattr(src, 'rtl', None)
+    if rtl is not None:
+        freq.value = rtl.get_center_freq()
+    try:
+        acquire_loop(src, rtl, ring, ctl, freq, stats)
+    finally:
+        if opt.record:
+            src.close()
+
+def acquire_loop(src, rtl, ring, ctl, freq, stats):
+    while True:
+        try:
+            while True:                 # apply control requests, if any
+                cmd, val = ctl.get_nowait()
+                if cmd == 'freq' and rtl is not None:
+                    rtl.center_freq = val
+                    freq.value = rtl.get_center_freq()
+                elif cmd == 'skip':
+                    src.set_skip(val)
+        except Queue.Empty:
+            pass
+        data = src.ReadChunk()
+        ring.put(data)                  # (dropped if DSP is behind)
+        stats[:] = src.stats
+
+def process(opt, ring_iq, ring_sp, full_scale, clip):
+    """ DSP process: spectra of chunks from ring_iq into ring_sp, as
+        rows (spectrum, peak hold, min hold).
+    """
+    mydsp = dsp.DSP(opt, full_scale)
+    while True:
+        data = ring_iq.get(4.)
+        if data is None:
+            print "DSP: timeout waiting for input!"
+            sys.exit()
+        sp_log = mydsp.GetLogPowerSpectrum(data)
+        if mydsp.led_clip_ct > 0:       # pass pulse LED to main
+            clip.value = 1
+            mydsp.led_clip_ct = 0
+        out = (sp_log,
+               sp_log if mydsp.peak_hold is None else mydsp.peak_hold,
+               sp_log if mydsp.min_hold is None else mydsp.min_hold)
+        ring_sp.put(out)                # (dropped if main is behind)
+
+class PipeDSP(object):
+    """ In main, stands in for the DSP (hold traces and LED flag).
+    """
+    def __init__(self):
+        self.peak_hold = self.min_hold = None
+        self.led_clip_ct = 0
+
+class PipeRTL(object):
+    """ In main, stands in for the RTL dongle's frequency control.
+    """
+    def __init__(self, ctl, freq):
+        self.ctl, self.freq = ctl, freq
+    def get_center_freq(self):
+        return self.freq.value
+    def set_center_freq(self, f):
+        self.ctl.put(('freq', f))
+        self.freq.value = f             # (until acquisition confirms)
+    center_freq = property(get_center_freq, set_center_freq)
+
+class Pipeline(object):
+    """ Starts the acquisition and DSP processes.  Used by main in place of
+        the input source: ReadSpectrum() instead of ReadChunk() + DSP.
+    """
+    def __init__(self, opt, full_scale=2**15):
+        size, chunk_size = opt.size, opt.buffers * opt.size
+        dtype = np.complex64 if opt.single else np.complex128
+        rdtype = np.float32 if opt.single else np.float64
+        self.opt = opt
+        self.ring_iq = SharedRing(IQ_SLOTS, (chunk_size,), dtype)
+        self.ring_sp = SharedRing(SP_SLOTS, (3, size), rdtype)
+        self.ctl = mp.Queue()
+        freq = mp.RawValue('d', 0.)
+        self.adc_stats = mp.RawArray('l', 2)
+        self.clip = mp.RawValue('i', 0)
+        self.dsp = PipeDSP()
+        self.rtl = PipeRTL(self.ctl, freq)
+        self.i_data = None
+        self.n_over = 0
+        self.procs = [
+            mp.Process(target=acquire, name="iq acquisition",
+                       args=(opt, self.ring_iq, self.ctl, freq,
+                             self.adc_stats)),
+            mp.Process(target=process, name="iq dsp",
+                       args=(opt, self.ring_iq, self.ring_sp, full_scale,
+                             self.clip)) ]
+        for p in self.procs:
+            p.daemon = True             # (end with main)
+            p.start()
+        return
+
+    def ReadSpectrum(self):
+        """ Wait for the next spectrum.  Returns it (a view, valid until
+            the next call); hold traces are set in self.dsp.
+        """
+        frame = self.ring_sp.get(10.)
+        if frame is None:
+            print "timeout waiting for spectrum from DSP process!"
+            sys.exit()
+        self.dsp.peak_hold = frame[1] if self.opt.peak_hold else None
+        self.dsp.min_hold = frame[2] if self.opt.min_hold else None
+        if self.clip.value:
+            self.dsp.led_clip_ct = 1
+            self.clip.value = 0
+        return frame[0]
+
+    @property
+    def stats(self):
+        return list(self.adc_stats)
+
+    def queue_stats(self):
+        # Chunks waiting for DSP, ring size, chunks dropped.
+        r = self.ring_iq
+        return r.occupancy(), r.nslots, r.overruns
+
+    def overran(self):
+        """ True if I/Q chunks were dropped since the last call.
+        """
+        n = self.ring_iq.overruns
+        new, self.n_over = n > self.n_over, n
+        return new
+
+    def pipe_stats(self):
+        # (chunks waiting, dropped), (spectra waiting, dropped)
+        return (self.ring_iq.occupancy(), self.ring_iq.overruns,
+                self.ring_sp.occupancy(), self.ring_sp.overruns)
+
+    def set_skip(self, skip):
+        self.ctl.put(('skip', skip))
+
+if __name__ == '__main__':
+    print 'debug'
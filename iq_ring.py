@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+
+# Program iq_ring.py - Ring buffer of preallocated sample frames.
+# Copyright (C) 2026 Mauri Niininen
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact the author by e-mail: ag1le@arrl.net
+#
+# Part of the iq.py program.
+
+# HISTORY
+# 10-17-2026 Initial version
+# 10-17-2026 LatestBuffer: newest-frame hand-over for streaming readers
+# 10-17-2026 LatestBuffer.claim/commit: producer fills a slot in place
+# 10-17-2026 Untimed waits (Wakeup); timeouts from a watchdog; close()
+
+# One producer (e.g. the pyaudio callback thread) and one consumer (the
+# main loop).  'head' is only advanced by the producer and 'tail' only by
+# the consumer, so no lock is needed.  The consumer gets a view of a slot,
+# not a copy; the slot is released on its next get() call, so the producer
+# never writes into a frame that is still being used.  When the ring is
+# full the producer drops the new frame and counts an overrun.
+#
+# The consumer waits with an untimed Condition.wait(): in Python 2 a wait
+# with a timeout is a loop of short sleeps (up to 50 ms), which is the
+# latency we want to get rid of.  A get() timeout comes from a watchdog
+# thread (Wakeup), which sleeps until the deadline and then wakes the
+# consumer; close() wakes it for shutdown.
+
+import threading, time
+import numpy as np
+
+WATCH_SECS = 0.5            # watchdog sleeps at most this long at a time
+
+class Wakeup(object):
+    """ Wait for a condition with an untimed Condition.wait(), woken by
+        the producer (notify()), the watchdog thread at the deadline, or
+        close().  One consumer.
+    """
+    def __init__(self, lock=None):
+        self.cond = threading.Condition(lock or threading.Lock())
+        self.deadline = None        # (consumer waiting with a timeout)
+        self.expired = False
+        self.closed = False
+        self.armed = threading.Event()  # (wakes the watchdog)
+        self.watchdog = None
+
+    def wait(self, ready, timeout=None):
+        """ With cond held: wait until ready() is true, timeout secs have
+            passed, or close() was called.  Returns ready().
+        """
+        if ready() or self.closed:
+            return ready()
+        self.expired = False
+        if timeout is not None:
+            self.deadline = time.time() + timeout
+            if self.watchdog is None:
+                self.watchdog = threading.Thread(target=self.watch)
+                self.watchdog.daemon = True
+                self.watchdog.start()
+            self.armed.set()
+        while not (ready() or self.closed or self.expired):
+            self.cond.wait()
+        self.deadline = None
+        return ready()
+
+    def notify(self):
+        """ Producer, with cond held: the condition may have changed.
+        """
+        self.cond.notify()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def watch(self):
+        """ Watchdog thread: sleep until the consumer's deadline, then
+            wake it.  Idle (untimed wait) while nobody waits.  (It sleeps
+            WATCH_SECS at most, in case a shorter timeout comes next, so a
+            timeout is at most that late.)
+        """
+        while True:
+            self.armed.wait()
+            with self.cond:
+                if self.deadline is None:
+                    self.armed.clear()
+                    continue
+                left = self.deadline - time.time()
+                if left <= 0.:
+                    self.expired = True
+                    self.deadline = None
+                    self.armed.clear()
+                    self.cond.notify_all()
+                    continue
+            time.sleep(min(left, WATCH_SECS))
+
+class RingBuffer(object):
+    def __init__(self, nslots, framelen, dtype=np.int16):
+        self.nslots = nslots
+        self.frames = np.zeros((nslots, framelen), dtype)
+        self.head = 0               # frames written (producer only)
+        self.tail = 0               # frames released (consumer only)
+        self.held = False           # consumer holds frame 'tail'
+        self.wakeup = Wakeup()
+        self.overruns = 0           # frames dropped, ring full
+        return
+
+    def put(self, data):
+        """ Producer: copy data (string/buffer or array) into the next
+            slot.  Return False if the ring is full (frame dropped).
+        """
+        if self.head - self.tail >= self.nslots:
+            self.overruns += 1
+            return False
+        slot = self.frames[self.head % self.nslots]
+        if isinstance(data, np.ndarray):
+            slot[...] = data.reshape(slot.shape)
+        else:
+            slot[...] = np.frombuffer(data, dtype=slot.dtype)
+        with self.wakeup.cond:
+            self.head += 1
+            self.wakeup.notify()    # wake up consumer
+        return True
+
+    def get(self, timeout=None):
+        """ Consumer: release the previous frame, wait for the next one.
+            Returns a view of the frame, or None after timeout (secs) or,
+            once the ring is empty, after close().
+        """
+        if self.held:
+            self.tail += 1
+            self.held = False
+        with self.wakeup.cond:
+            if not self.wakeup.wait(lambda: self.head != self.tail, timeout):
+                return None
+        self.held = True
+        return self.frames[self.tail % self.nslots]
+
+    def close(self):
+        """ No more frames: get() returns None when the ring is empty.
+        """
+        self.wakeup.close()
+
+    def occupancy(self):
+        """ Frames waiting for the consumer (including one in use).
+        """
+        return self.head - self.tail
+
+class LatestBuffer(object):
+    """ For a producer that must never wait (e.g. a USB streaming reader)
+        and a consumer that only wants the newest data.  The producer
+        writes into a slot that is neither the newest frame nor the one
+        held by the consumer (so 3 slots are enough), and get() returns
+        the newest complete frame.  Frames the consumer never saw are
+        counted as gaps.
+    """
+    def __init__(self, nslots, framelen, dtype=np.uint8):
+        self.nslots = max(3, nslots)
+        self.frames = np.zeros((self.nslots, framelen), dtype)
+        self.seq = [-1] * self.nslots   # frame number in each slot
+        self.count = 0                  # frames written
+        self.latest = -1                # slot of newest frame
+        self.held = -1                  # slot held by consumer
+        self.next = 0                   # producer's round robin
+        self.filling = -1               # slot claimed by producer
+        self.last_seq = -1              # frame number last given out
+        self.gaps = 0                   # frames lost (overwritten unseen)
+        self.lock = threading.Lock()
+        self.wakeup = Wakeup(self.lock)
+        return
+
+    def put(self, data):
+        """ Producer: copy data (string/buffer or array) into a free slot
+            and make it the newest frame.
+        """
+        frame = self.claim()
+        if isinstance(data, np.ndarray):
+            frame[...] = data.reshape(frame.shape)
+        else:
+            frame[...] = np.frombuffer(data, dtype=frame.dtype)
+        self.commit()
+        return
+
+    def claim(self):
+        """ Producer: a free slot, to fill in place (e.g. by recv_into),
+            then commit().
+        """
+        with self.lock:
+            while self.next in (self.latest, self.held):
+                self.next = (self.next + 1) % self.nslots
+            self.filling = self.next
+            self.next = (self.filling + 1) % self.nslots
+        return self.frames[self.filling]
+
+    def commit(self):
+        """ Producer: make the claimed slot the newest frame.
+        """
+        with self.lock:
+            self.seq[self.filling] = self.count
+            self.count += 1
+            self.latest = self.filling
+            self.wakeup.notify()        # wake up consumer
+        return
+
+    def get(self, timeout=None):
+        """ Consumer: wait for a frame newer than the last one, and hold
+            it (until the next call).  Returns a view, or None on timeout
+            or close().
+        """
+        with self.lock:
+            if not self.wakeup.wait(self.newer, timeout):
+                return None
+            self.held = self.latest
+            seq = self.seq[self.held]
+            if self.last_seq >= 0:
+                self.gaps += seq - self.last_seq - 1
+            self.last_seq = seq
+            return self.frames[self.held]
+
+    def newer(self):
+        # (With lock held.)  A frame the consumer has not seen?
+        return self.latest >= 0 and self.seq[self.latest] > self.last_seq
+
+    def close(self):
+        """ No more frames: get() returns None.
+        """
+        self.wakeup.close()
+
+    def occupancy(self):
+        """ Frames written but not yet given out.
+        """
+        return self.count - 1 - self.last_seq
+
+if __name__ == '__main__':
+    print 'debug'
@@ -22,8 +22,21 @@
 
 # HISTORY
 # 01-04-2014 Initial release
+# 10-17-2026 ReadChunk() etc., common input interface (see iq_src.py)
+# 10-17-2026 Streaming reader thread; ReadChunk takes the newest chunk
+# 10-17-2026 Raw bytes to complex64 in a reused buffer (iq_conv)
 
+import sys, threading
 import rtlsdr
+import iq_ring, iq_conv
+
+RTL_SLOTS = 4                   # chunks of raw bytes in the reader's ring
+
+# The dongle is read continuously by a thread, so USB transfers go on
+# while we do DSP and drawing.  The thread hands over chunks of raw bytes
+# (I,Q interleaved) through an iq_ring.LatestBuffer: ReadChunk() gets the
+# newest complete chunk, and chunks we were too slow to take are counted
+# as gaps.
 
 class RTL_In(object):
     def __init__(self, opt):
@@ -33,11 +46,47 @@ class RTL_In(object):
         self.rtl.sample_rate = opt.sample_rate
         self.rtl.center_freq = opt.rtl_frequency
         self.rtl.set_gain(opt.rtl_gain)
+        self.chunk_size = opt.buffers * opt.size
+        # Raw bytes to complex64, in a reused buffer.
+        self.conv = iq_conv.ByteConverter(opt, self.chunk_size)
+        self.stats = self.conv.stats    # (no ADC max. stats for RTL, for now)
+        self.i_data = self.conv.out.real    # I channel of last chunk
+        self.raw_format = 'cu8'     # uint8 I,Q pairs (see iq_file)
+        # Start the streaming reader.
+        self.ring = iq_ring.LatestBuffer(RTL_SLOTS, 2*self.chunk_size)
+        self.reader = threading.Thread(target=self.stream)
+        self.reader.daemon = True
+        self.reader.start()
         return
+
+    def stream(self):
+        """ Reader thread: raw bytes from the dongle into the ring.
+        """
+        nbytes = 2 * self.chunk_size
+        while True:
+            self.ring.put(self.rtl.read_bytes(nbytes))
     
     def ReadSamples(self,size):
         return  self.rtl.read_samples(size)
 
+    def ReadChunk(self):
+        """ Return the next chunk of complex I/Q samples (complex64; the
+            array is reused by the next call).
+        """
+        raw = self.ring.get(4.)
+        if raw is None:
+            print "timeout waiting for RTL data!"
+            sys.exit()
+        self.raw = raw
+        return self.conv.convert(raw)     # (REV is done here, too)
+
+    def queue_stats(self):
+        # Chunks waiting, ring size, chunks lost (gaps).
+        return self.ring.occupancy(), self.ring.nslots, self.ring.gaps
+
+    def set_skip(self, skip):
+        pass                        # (we always take the newest chunk)
+
 if __name__ == '__main__':
     print "Debug"
 
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+
+# Program iq_rtltcp.py - I/Q input from an rtl_tcp server on the network.
+# Copyright (C) 2026 Mauri Niininen
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact the author by e-mail: ag1le@arrl.net
+#
+# Part of the iq.py program.
+
+# HISTORY
+# 10-17-2026 Initial version
+# 10-17-2026 ReadChunk waits while the reader reconnects
+# 10-17-2026 ... and until the first chunk after the reconnect is in
+
+# --source=rtl_tcp --rtl_tcp=HOST:PORT: the dongle is on another machine,
+# served by rtl_tcp (part of rtl-sdr).  The protocol: on connect the
+# server sends a 12 byte header ("RTL0", tuner type, no. of gains); from
+# then on it streams uint8 I,Q pairs, the same bytes as a local dongle.
+# We send 5 byte commands: command byte, then a big endian 32-bit value.
+#
+# As in iq_rtl, a reader thread takes the stream into an
+# iq_ring.LatestBuffer, and ReadChunk() takes the newest chunk.  The
+# reader recv_into()s straight into the ring slot, and iq_conv converts
+# from that slot, so the bytes are never copied in Python.  (rtl_tcp
+# sends in large bursts, many chunks at a time; as with the dongle we
+# show the newest one, and the rest count as gaps.)  The 'rtl'
+# attribute controls the remote dongle with the same center_freq /
+# get_center_freq() as pyrtlsdr's RtlSdr, so iq.py's frequency control
+# works unchanged.  A lost connection is reopened (with the settings
+# sent again) every RECONNECT_SECS; ReadChunk() waits for it as long as
+# it takes.
+
+import socket, struct, sys, threading, time
+import iq_ring, iq_conv
+
+RTL_SLOTS = 4               # chunks of raw bytes in the reader's ring
+HEADER_SIZE = 12            # "RTL0", tuner type, gain count
+RECONNECT_SECS = 2.0
+STALL_SECS = 5.             # secs without data: reconnect
+TIMEOUT = 10.               # secs without data (and connected): give up
+# rtl_tcp commands
+SET_FREQ, SET_RATE, SET_GAIN_MODE, SET_GAIN = 0x01, 0x02, 0x03, 0x04
+TUNERS = { 1: "E4000", 2: "FC0012", 3: "FC0013", 4: "FC2580",
+           5: "R820T", 6: "R828D" }
+
+class RtlTcpControl(object):
+    """ Stands in for pyrtlsdr's RtlSdr: settings go to the rtl_tcp
+        server as commands.
+    """
+    def __init__(self, opt):
+        self.sock = None
+        self.lock = threading.Lock()
+        self.freq = opt.rtl_frequency
+        self.rate = opt.sample_rate
+        self.gain = opt.rtl_gain
+
+    def command(self, cmd, value):
+        with self.lock:
+            if self.sock is not None:
+                try:
+                    self.sock.sendall(struct.pack(">BI", cmd, int(value)))
+                except socket.error:
+                    pass                # (reader reconnects, resends)
+
+    def send_all(self):
+        """ All settings, e.g. on (re)connect.
+        """
+        self.command(SET_RATE, self.rate)
+        self.command(SET_FREQ, self.freq)
+        self.set_gain(self.gain)
+
+    def get_center_freq(self):
+        return self.freq
+
+    def set_center_freq(self, freq):
+        self.freq = freq
+        self.command(SET_FREQ, freq)
+
+    center_freq = property(get_center_freq, set_center_freq)
+
+    def set_gain(self, gain):
+        """ gain in dB; 0 = auto (as --rtl_gain).
+        """
+        self.gain = gain
+        if gain == 0:
+            self.command(SET_GAIN_MODE, 0)
+        else:
+            self.command(SET_GAIN_MODE, 1)
+            self.command(SET_GAIN, gain * 10)   # (tenths of dB)
+
+class RtlTcpIn(object):
+    def __init__(self, opt):
+        self.opt = opt
+        host, _, port = opt.rtl_tcp.rpartition(':')
+        try:
+            self.addr = (host or "localhost", int(port))
+        except ValueError:
+            print "--rtl_tcp=HOST:PORT expected"
+            sys.exit()
+        self.rtl = RtlTcpControl(opt)
+        self.chunk_size = opt.buffers * opt.size
+        # Raw bytes to complex64, in a reused buffer.
+        self.conv = iq_conv.ByteConverter(opt, self.chunk_size)
+        self.stats = self.conv.stats    # (no ADC max. stats for RTL)
+        self.i_data = self.conv.out.real    # I channel of last chunk
+        self.raw_format = 'cu8'         # uint8 I,Q pairs (see iq_file)
+        self.ring = iq_ring.LatestBuffer(RTL_SLOTS, 2*self.chunk_size)
+        self.reconnecting = False       # (reconnecting, no new chunk yet)
+        if not self.connect():          # (first time: must work)
+            sys.exit()
+        self.reader = threading.Thread(target=self.stream)
+        self.reader.daemon = True
+        self.reader.start()
+        return
+
+    def connect(self):
+        """ Connect, read the header, send our settings.  False if failed.
+        """
+        try:
+            sock = socket.create_connection(self.addr, STALL_SECS)
+            hdr = ""
+            while len(hdr) < HEADER_SIZE:
+                data = sock.recv(HEADER_SIZE - len(hdr))
+                if not data:
+                    raise socket.error("connection closed")
+                hdr += data
+        except socket.error as e:
+            print "rtl_tcp %s:%d: %s" % (self.addr[0], self.addr[1], e)
+            return False
+        magic, tuner, ngains = struct.unpack(">4sII", hdr)
+        if magic != "RTL0":
+            print "rtl_tcp %s:%d: not an rtl_tcp server" % self.addr
+            sock.close()
+            return False
+        print "rtl_tcp %s:%d: tuner %s, %d gains" % (self.addr[0],
+            self.addr[1], TUNERS.get(tuner, "unknown"), ngains)
+        sock.settimeout(STALL_SECS)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        with self.rtl.lock:
+            self.rtl.sock = sock
+        self.rtl.send_all()
+        return True
+
+    def stream(self):
+        """ Reader thread: fill ring slots from the socket, in place.
+        """
+        while True:
+            frame = self.ring.claim()
+            view = memoryview(frame)
+            got, n = 0, len(frame)
+            try:
+                while got < n:
+                    k = self.rtl.sock.recv_into(view[got:], n - got)
+                    if k == 0:
+                        raise socket.error("connection closed")
+                    got += k
+            except socket.error as e:
+                print "rtl_tcp: %s; reconnecting" % e
+                self.reconnecting = True
+                with self.rtl.lock:
+                    self.rtl.sock.close()
+                    self.rtl.sock = None
+                while not self.connect():
+                    time.sleep(RECONNECT_SECS)
+                continue                # (partial chunk dropped)
+            self.ring.commit()
+            self.reconnecting = False   # (data flowing again)
+
+    def ReadChunk(self):
+        """ Return the next chunk of complex I/Q samples (complex64; the
+            array is reused by the next call).
+        """
+        raw = self.ring.get(TIMEOUT)
+        while raw is None:
+            if not self.reconnecting:
+                print "timeout waiting for rtl_tcp data!"
+                sys.exit()
+            raw = self.ring.get(TIMEOUT)    # (server away: keep waiting)
+        self.raw = raw
+        return self.conv.convert(raw)   # (REV is done here, too)
+
+    def queue_stats(self):
+        # Chunks waiting, ring size, chunks lost (gaps).
+        return self.ring.occupancy(), self.ring.nslots, self.ring.gaps
+
+    def set_skip(self, skip):
+        pass                            # (we always take the newest chunk)
+
+if __name__ == '__main__':
+    print 'debug'
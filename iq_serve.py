@@ -0,0 +1,398 @@
+#!/usr/bin/env python
+
+# Program iq_serve.py - Spectrum / waterfall row server for remote clients.
+# Copyright (C) 2026 Mauri Niininen
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact the author by e-mail: ag1le@arrl.net
+#
+# Part of the iq.py program.
+
+# HISTORY
+# 10-17-2026 Initial version
+# 10-17-2026 Client.write: socket writes under a lock (pong vs rows)
+
+# --HEADLESS --sink=serve:[HOST:]PORT: one receiver and one DSP, any number
+# of operators.  Each spectrum becomes a row that is published to every
+# connected client, plain TCP or WebSocket (a client that starts with an
+# HTTP "GET" is taken to be a WebSocket).  A client subscribes with
+#   width=PIXELS rate=ROWS_PER_SEC
+# (a line of text over TCP, the query string "/?width=..&rate=.." or a
+# text message over WebSocket; send another one at any time to change).
+# width decimates the bins to pixels (keeping the peak of the bins in
+# each pixel, like the local display); rate=0 sends every row.
+#
+# Rows are dB quantised to uint8 over --sp_min..--sp_max (as iq_sink u8),
+# sent as the difference from the client's previous row (mod 256; mostly
+# small values) and zlib compressed.  Every KEY_ROWS rows, and when the
+# width changes, a full (key) row is sent instead.
+#
+# The DSP loop only decimates and quantises a row (once per width in
+# use) and appends it to each client's deque of CLIENT_ROWS; a full deque
+# drops its oldest row.  Delta, compression and the socket writes are
+# done by each client's own thread, so a slow client gets fewer rows and
+# never holds up the DSP or the other clients.
+#
+# Message: ROW_HEADER then the zlib payload.  Over WebSocket, one binary
+# message each.  RowDecoder turns messages back into rows.
+
+import base64, collections, hashlib, socket, struct, sys, threading, time
+import urlparse, zlib
+import numpy as np
+import iq_sink
+
+MAGIC = "IQWF"
+# magic, kind (KEY / DELTA), 0, width, row no., rows dropped (total),
+# sample rate (Hz), time (secs), center freq. (Hz), lo, hi (dB), payload len
+ROW_HEADER = struct.Struct("<4sBBHIIIddffI")
+KEY, DELTA = 1, 2
+CLIENT_ROWS = 16            # rows queued per client before dropping
+KEY_ROWS = 50               # full row at least every ...
+ZLIB_LEVEL = 1              # (fast; deltas compress well anyway)
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+MAX_LINE = 1024             # longest subscription request
+
+def parse_params(text):
+    """ "width=512 rate=10" (or '&' separated) -> dict of floats.
+    """
+    params = dict()
+    for item in text.replace('&', ' ').split():
+        key, _, val = item.partition('=')
+        try:
+            params[key] = float(val)
+        except ValueError:
+            pass
+    return params
+
+class Client(object):
+    """ One connected client: its subscription, row deque and sender.
+    """
+    def __init__(self, server, conn, addr):
+        self.server = server
+        self.conn = conn
+        self.addr = addr
+        self.ws = False
+        self.width = server.nbins       # pixels
+        self.period = 0.                # secs between rows (0 = all)
+        self.t_next = 0.
+        self.rows = collections.deque(maxlen=CLIENT_ROWS)
+        self.ready = threading.Event()
+        self.wlock = threading.Lock()   # (sender and reader both write)
+        self.dropped = 0
+        self.sent = 0
+        self.running = True
+
+    def subscribe(self, params):
+        if 'width' in params:
+            self.width = max(1, min(self.server.nbins, int(params['width'])))
+        if 'rate' in params:
+            rate = params['rate']
+            self.period = 1. / rate if rate > 0 else 0.
+
+    def due(self, now):
+        """ True if a row is due now (the client's rate); and count it.
+        """
+        if self.period == 0.:
+            return True
+        if now < self.t_next:
+            return False
+        self.t_next += self.period
+        if self.t_next < now:           # (first row, or fell behind)
+            self.t_next = now + self.period
+        return True
+
+    def push(self, row):
+        """ (DSP loop) Queue row; a full deque drops its oldest row.
+        """
+        if len(self.rows) == self.rows.maxlen:
+            self.dropped += 1
+        self.rows.append(row)
+        self.ready.set()
+
+    def run(self):
+        """ Client thread: handshake, then a reader for subscription
+            changes, and send rows until the connection is lost.
+        """
+        try:
+            self.handshake()
+        except (socket.error, ValueError) as e:
+            print "Server: client %s: %s" % (self.addr[0], e)
+            self.conn.close()
+            return
+        reader = threading.Thread(target=self.read_loop)
+        reader.daemon = True
+        reader.start()
+        self.server.add(self)
+        try:
+            self.send_loop()
+        except socket.error:
+            pass
+        self.running = False
+        self.server.remove(self)
+        self.conn.close()
+
+    def handshake(self):
+        self.conn.settimeout(1.)
+        try:
+            start = self.conn.recv(4, socket.MSG_PEEK)
+        except socket.timeout:
+            start = ""                  # (TCP client that only listens)
+        self.conn.settimeout(None)
+        if start != "GET ":
+            return
+        # WebSocket: read the HTTP upgrade request, answer it.
+        self.ws = True
+        self.rfile = self.conn.makefile('rb', 0)
+        request = self.rfile.readline(MAX_LINE).split()
+        headers = dict()
+        while True:
+            line = self.rfile.readline(MAX_LINE).strip()
+            if not line:
+                break
+            key, _, val = line.partition(':')
+            headers[key.strip().lower()] = val.strip()
+        if len(request) < 2 or 'sec-websocket-key' not in headers:
+            raise ValueError("not a WebSocket request")
+        self.subscribe(parse_params(urlparse.urlparse(request[1]).query))
+        accept = base64.b64encode(hashlib.sha1(
+                    headers['sec-websocket-key'] + WS_GUID).digest())
+        self.conn.sendall("HTTP/1.1 101 Switching Protocols\r\n"
+                          "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                          "Sec-WebSocket-Accept: %s\r\n\r\n" % accept)
+
+    def read_loop(self):
+        """ Take subscription changes until the client goes away.
+        """
+        try:
+            if self.ws:
+                while self.running:
+                    opcode, data = self.ws_read()
+                    if opcode == 0x1:                       # text
+                        self.subscribe(parse_params(data))
+                    elif opcode == 0x8:                     # close
+                        break
+                    elif opcode == 0x9:                     # ping
+                        self.write(data, 0xA)               # pong
+            else:
+                rfile = self.conn.makefile('rb', 0)
+                while self.running:
+                    line = rfile.readline(MAX_LINE)
+                    if not line:
+                        break
+                    self.subscribe(parse_params(line))
+        except (socket.error, ValueError, struct.error):
+            pass
+        self.running = False
+        self.ready.set()                # (wake the sender to finish)
+
+    def ws_read(self):
+        """ One WebSocket frame from the client: (opcode, payload).
+        """
+        b0, b1 = struct.unpack("BB", self.read_exactly(2))
+        n = b1 & 0x7f
+        if n == 126:
+            n = struct.unpack(">H", self.read_exactly(2))[0]
+        elif n == 127:
+            n = struct.unpack(">Q", self.read_exactly(8))[0]
+        if n > MAX_LINE:
+            raise ValueError("message too long")
+        mask = self.read_exactly(4) if b1 & 0x80 else None
+        data = self.read_exactly(n)
+        if mask:
+            data = (np.frombuffer(data, np.uint8) ^
+                    np.resize(np.frombuffer(mask, np.uint8), n)).tostring()
+        return b0 & 0x0f, data
+
+    def read_exactly(self, n):
+        data = self.rfile.read(n)
+        if len(data) < n:
+            raise ValueError("connection closed")
+        return data
+
+    def write(self, data, opcode):
+        """ Send data (as a WebSocket frame of opcode, if WebSocket).  One
+            writer at a time, so frames from two threads never interleave.
+        """
+        with self.wlock:
+            if self.ws:
+                self.server.ws_send(self.conn, data, opcode)
+            else:
+                self.conn.sendall(data)
+
+    def send_loop(self):
+        prev, nrows = None, 0           # last row sent, rows since key
+        while True:
+            self.ready.wait()
+            self.ready.clear()
+            while self.rows:
+                meta, row = self.rows.popleft()
+                if prev is None or len(prev) != len(row) or \
+                        nrows >= KEY_ROWS:
+                    kind, data, nrows = KEY, row, 0
+                else:
+                    kind, data = DELTA, row - prev  # (uint8: mod 256)
+                nrows += 1
+                prev = row
+                payload = zlib.compress(data.tostring(), ZLIB_LEVEL)
+                seq, t, freq = meta
+                msg = ROW_HEADER.pack(MAGIC, kind, 0, len(row), seq,
+                            self.dropped & 0xffffffff, self.server.rate,
+                            t, freq, self.server.lo, self.server.hi,
+                            len(payload)) + payload
+                self.write(msg, 0x2)
+                self.sent += 1
+            if not self.running:
+                return
+
+class Server(object):
+    """ Publishes spectra to clients.  Used by iq_sink.run() in place of
+        a Sink, with --sink=serve:[HOST:]PORT.
+    """
+    def __init__(self, opt):
+        host, _, port = opt.sink.partition(':')[2].rpartition(':')
+        try:
+            self.addr = (host, int(port))
+        except ValueError:
+            print "--sink=serve:[HOST:]PORT expected"
+            sys.exit()
+        self.nbins = opt.size
+        self.rate = int(opt.sample_rate)
+        self.lo, self.hi = float(opt.sp_min), float(opt.sp_max)
+        self.q = np.empty(self.nbins, np.uint8)
+        self.tmp = np.empty(self.nbins, np.float32)
+        self.edges = dict()             # width -> first bin of each pixel
+        self.clients = []
+        self.lock = threading.Lock()
+        self.seq = 0
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            self.listener.bind(self.addr)
+        except socket.error as e:
+            print "Server: cannot listen on %s:%d: %s" % (host, self.addr[1], e)
+            sys.exit()
+        self.listener.listen(5)
+        t = threading.Thread(target=self.accept_loop)
+        t.daemon = True
+        t.start()
+        return
+
+    def accept_loop(self):
+        while True:
+            conn, addr = self.listener.accept()
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            t = threading.Thread(target=Client(self, conn, addr).run)
+            t.daemon = True
+            t.start()
+
+    def add(self, client):
+        with self.lock:
+            self.clients = self.clients + [client]
+        print "Server: client %s connected (%s); %d clients" % \
+            (client.addr[0], "WebSocket" if client.ws else "TCP",
+             len(self.clients))
+
+    def remove(self, client):
+        with self.lock:
+            self.clients = [c for c in self.clients if c is not client]
+        print "Server: client %s gone; %d clients" % \
+            (client.addr[0], len(self.clients))
+
+    def ws_send(self, conn, data, opcode):
+        """ Send data as one (unmasked, server to client) WebSocket frame.
+        """
+        n = len(data)
+        if n < 126:
+            hdr = struct.pack("BB", 0x80 | opcode, n)
+        elif n < 65536:
+            hdr = struct.pack(">BBH", 0x80 | opcode, 126, n)
+        else:
+            hdr = struct.pack(">BBQ", 0x80 | opcode, 127, n)
+        conn.sendall(hdr + data)
+
+    def send(self, sp_log, center_freq=0.):
+        """ (DSP loop) Publish spectrum sp_log (dB) to the clients that
+            want a row now.  Rows are made once per width in use.
+        """
+        clients = self.clients          # (replaced, never changed in place)
+        if not clients:
+            return
+        now = time.time()
+        meta = (self.seq & 0xffffffff, now, center_freq)
+        self.seq += 1
+        rows = dict()
+        for c in clients:
+            if not c.due(now):
+                continue
+            row = rows.get(c.width)
+            if row is None:
+                if not rows:
+                    iq_sink.quantise(sp_log, self.lo, self.hi, self.q,
+                                     self.tmp)
+                row = rows[c.width] = self.decimate(c.width)
+            c.push((meta, row))         # (rows are never changed later)
+
+    def decimate(self, width):
+        """ New row of width pixels: the peak of the bins in each pixel.
+        """
+        if width >= self.nbins:
+            return self.q.copy()
+        edges = self.edges.get(width)
+        if edges is None:
+            edges = self.edges[width] = \
+                np.arange(width) * self.nbins / width
+        return np.maximum.reduceat(self.q, edges)
+
+    def status(self):
+        clients = self.clients
+        return "%d clients, %d rows sent, %d dropped" % (len(clients),
+            sum(c.sent for c in clients), sum(c.dropped for c in clients))
+
+class RowDecoder(object):
+    """ Client side: turns messages back into rows (uint8, per pixel).
+    """
+    def __init__(self):
+        self.prev = None
+
+    def decode(self, msg):
+        """ msg: one message.  Returns (header dict, row); dB of the row is
+            lo + row * (hi - lo) / 255.
+        """
+        magic, kind, _, width, seq, dropped, rate, t, freq, lo, hi, n = \
+            ROW_HEADER.unpack_from(msg)
+        if magic != MAGIC:
+            raise ValueError("not a row message")
+        data = np.frombuffer(zlib.decompress(
+                    msg[ROW_HEADER.size:ROW_HEADER.size+n]), np.uint8)
+        if kind == KEY:
+            row = data.copy()
+        else:
+            row = self.prev + data      # (uint8: mod 256)
+        self.prev = row
+        return dict(seq=seq, dropped=dropped, sample_rate=rate, time=t,
+                    center_freq=freq, lo=lo, hi=hi), row
+
+def read_message(f):
+    """ Read one message from a plain TCP stream (file object f); None at
+        end of stream.
+    """
+    hdr = f.read(ROW_HEADER.size)
+    if len(hdr) < ROW_HEADER.size:
+        return None
+    n = ROW_HEADER.unpack(hdr)[-1]
+    return hdr + f.read(n)
+
+if __name__ == '__main__':
+    print 'debug'
@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+
+# Program iq_sink.py - Headless mode: stream spectra to a sink, no display.
+# Copyright (C) 2026 Mauri Niininen
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact the author by e-mail: ag1le@arrl.net
+#
+# Part of the iq.py program.
+
+# HISTORY
+# 10-17-2026 Initial version
+# 10-17-2026 --sink=serve:[HOST:]PORT, row server for many clients (iq_serve)
+
+# With --HEADLESS, iq.py does not load pygame or open a display.  The input
+# (iq_src, or the --PIPELINE processes) goes through iq_dsp.DSP as usual,
+# and each log power spectrum is sent as one frame to --sink:
+#   stdout              (messages then go to stderr)
+#   file:PATH           appended
+#   unix:PATH           UNIX stream socket (connect)
+#   tcp:HOST:PORT       TCP connection to a collector
+#   udp:HOST:PORT       one datagram per frame
+#   serve:[HOST:]PORT   listen for any number of clients (see iq_serve)
+# A frame is a HEADER (see below) and the spectrum, --sink_format:
+#   f32 - float32 dB per bin
+#   u8  - dB quantised to 0..255 over lo..hi (--sp_min..--sp_max) dB,
+#         a quarter of the bytes; more than enough for a waterfall.
+# Frames go out from a writer thread through an iq_ring.RingBuffer, so a
+# slow or lost collector drops frames (counted) and never stalls the DSP;
+# socket sinks reconnect every RECONNECT_SECS.  read_frames() decodes a
+# stream of frames, for collectors.
+
+import os, signal, socket, struct, sys, threading, time
+import numpy as np
+import iq_dsp as dsp
+import iq_ring, iq_src
+
+MAGIC = "IQSP"
+# magic, format (FORMATS), 0, 0, bins, frame no., sample rate (Hz),
+# time (secs since epoch), center freq. (Hz), lo, hi (dB, u8 scale)
+HEADER = struct.Struct("<4sBBHIIIddff")
+FORMATS = { 'f32': 1, 'u8': 2 }
+SINK_SLOTS = 32             # frames waiting for the writer thread
+RECONNECT_SECS = 2.0        # wait between socket (re)connect attempts
+STATUS_SECS = 10.0          # status line to stderr every ...
+
+def quantise(sp_log, lo, hi, out, tmp):
+    """ dB to uint8 into out: lo..hi dB -> 0..255, clipped and rounded.
+        tmp: float32 work array like out.
+    """
+    scale = 255. / (hi - lo)
+    # (dB - lo) * scale, clipped to 0..255, in place; +0.5 rounds.
+    np.subtract(sp_log, lo - 0.5 / scale, out=tmp)
+    tmp *= scale
+    np.clip(tmp, 0., 255., out=tmp)
+    out[...] = tmp
+
+class Sink(object):
+    """ Sends spectra as frames to opt.sink, from a writer thread.
+    """
+    def __init__(self, opt):
+        self.opt = opt
+        self.fmt = opt.sink_format
+        self.lo, self.hi = float(opt.sp_min), float(opt.sp_max)
+        self.nbins = opt.size
+        self.itemsize = 4 if self.fmt == 'f32' else 1
+        self.frame = np.zeros(HEADER.size + self.nbins * self.itemsize,
+                              np.uint8)
+        self.payload = self.frame[HEADER.size:].view(
+                            np.float32 if self.fmt == 'f32' else np.uint8)
+        self.tmp = np.empty(self.nbins, np.float32)
+        self.seq = 0
+        self.sent = 0
+        self.kind, _, self.addr = opt.sink.partition(':')
+        if self.kind not in ("stdout", "file", "unix", "tcp", "udp"):
+            print "Unknown --sink:", opt.sink
+            sys.exit()
+        self.out = None
+        self.t_connect = 0.
+        if self.kind == "stdout":
+            # Keep fd 1 for the frames; anything printed (by any module,
+            # or C library) goes to stderr instead.
+            self.out = os.fdopen(os.dup(1), 'wb', 0)
+            os.dup2(2, 1)
+            sys.stdout = sys.stderr
+        elif self.kind == "file":
+            try:
+                self.out = open(self.addr, 'ab', 0)
+            except IOError as e:
+                print "Cannot open sink file:", e
+                sys.exit()
+        elif self.kind in ("tcp", "udp"):
+            host, _, port = self.addr.rpartition(':')
+            try:
+                self.addr = (host, int(port))
+            except ValueError:
+                print "--sink=%s:HOST:PORT expected" % self.kind
+                sys.exit()
+        self.ring = iq_ring.RingBuffer(SINK_SLOTS, len(self.frame), np.uint8)
+        self.writer = threading.Thread(target=self.write_loop)
+        self.writer.daemon = True
+        self.writer.start()
+        return
+
+    def send(self, sp_log, center_freq=0.):
+        """ Queue spectrum sp_log (dB) as the next frame.  Returns False if
+            it had to be dropped.
+        """
+        HEADER.pack_into(self.frame, 0, MAGIC, FORMATS[self.fmt], 0, 0,
+                         self.nbins, self.seq & 0xffffffff,
+                         int(self.opt.sample_rate), time.time(),
+                         center_freq, self.lo, self.hi)
+        self.seq += 1
+        if self.fmt == 'f32':
+            self.payload[...] = sp_log
+        else:
+            quantise(sp_log, self.lo, self.hi, self.payload, self.tmp)
+        return self.ring.put(self.frame)
+
+    def status(self):
+        return "%d sent, %d dropped" % (self.sent, self.ring.overruns)
+
+    def connect(self):
+        """ (Re)open the socket sink; returns False if not (yet) possible.
+        """
+        now = time.time()
+        if now - self.t_connect < RECONNECT_SECS:
+            return False
+        self.t_connect = now
+        try:
+            if self.kind == "unix":
+                s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            elif self.kind == "tcp":
+                s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            else:
+                s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            s.connect(self.addr)
+        except socket.error as e:
+            print >>sys.stderr, "Sink %s: %s" % (self.opt.sink, e)
+            return False
+        self.out = s
+        return True
+
+    def write_loop(self):
+        while True:
+            frame = self.ring.get()
+            if self.out is None and not self.connect():
+                continue                # (frame dropped)
+            try:
+                if self.kind in ("stdout", "file"):
+                    self.out.write(frame.tostring())
+                else:
+                    self.out.sendall(frame)
+                self.sent += 1
+            except (IOError, socket.error) as e:
+                if self.kind in ("stdout", "file"):
+                    print >>sys.stderr, "Sink write failed:", e
+                    os._exit(1)         # (reader gone: nothing more to do)
+                print >>sys.stderr, "Sink %s: %s" % (self.opt.sink, e)
+                self.out.close()
+                self.out = None
+
+def read_frames(f):
+    """ Generator: (header dict, spectrum in dB as float32) for each frame
+        read from file object f, until EOF.
+    """
+    while True:
+        hdr = f.read(HEADER.size)
+        if len(hdr) < HEADER.size:
+            return
+        magic, fmt, _, _, nbins, seq, rate, t, freq, lo, hi = \
+            HEADER.unpack(hdr)
+        if magic != MAGIC:
+            raise ValueError("not a spectrum frame")
+        if fmt == FORMATS['f32']:
+            sp = np.frombuffer(f.read(4 * nbins), np.float32)
+        else:
+            q = np.frombuffer(f.read(nbins), np.uint8)
+            sp = (lo + q * ((hi - lo) / 255.)).astype(np.float32)
+        yield dict(seq=seq, sample_rate=rate, time=t, center_freq=freq,
+                   lo=lo, hi=hi), sp
+
+def run(opt):
+    """ Headless main loop: input -> DSP -> sink, until interrupted.
+    """
+    if opt.sink.startswith("serve:"):
+        import iq_serve
+        sink = iq_serve.Server(opt)
+    else:
+        sink = Sink(opt)                # (first: may move stdout)
+    # Stop cleanly on kill / service stop: ends the --PIPELINE processes
+    # and closes a --record file.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit())
+    print "Headless: %s, %d Hz, %d bins, %s frames to %s" % \
+        (opt.source, opt.sample_rate, opt.size, opt.sink_format, opt.sink)
+    chunk_time = float(opt.buffers * opt.size) / opt.sample_rate
+    full_scale = iq_src.full_scale(opt)
+    if opt.pipeline:
+        import iq_pipe
+        src = iq_pipe.Pipeline(opt, full_scale)
+    else:
+        src = iq_src.open_source(opt)
+        mydsp = dsp.DSP(opt, full_scale)
+    rtl = getattr(src, 'rtl', None)
+    center = float(getattr(src, 'meta', {}).get('center_freq', 0.))
+    nspec, busy = 0, 0.
+    t_status = time.time()
+    try:
+        while True:
+            if opt.pipeline:
+                sp_log = src.ReadSpectrum()
+                t0 = time.time()
+            else:
+                data = src.ReadChunk()
+                t0 = time.time()
+                sp_log = mydsp.GetLogPowerSpectrum(data)
+            if rtl is not None:
+                center = rtl.get_center_freq()
+            sink.send(sp_log, center)
+            nspec += 1
+            busy += time.time() - t0
+            if t0 - t_status > STATUS_SECS:
+                print "Headless: %d spectra, %s; load %.2f" % \
+                    (nspec, sink.status(), busy / (nspec * chunk_time))
+                sys.stdout.flush()
+                t_status = t0
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    print 'debug'
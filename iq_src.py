@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+# Program iq_src.py - Open the I/Q input source chosen by the options.
+# Copyright (C) 2026 Mauri Niininen
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact the author by e-mail: ag1le@arrl.net
+#
+# Part of the iq.py program.
+
+# HISTORY
+# 10-17-2026 Initial version: RTL and audio sources
+# 10-17-2026 File playback source; --record wraps any source
+# 10-17-2026 Signal generator source; Pacer (real time for file & gen)
+# 10-17-2026 rtl_tcp network source
+
+# Every source has:
+#   ReadChunk()     next chunk (opt.buffers * opt.size) of complex I/Q
+#   stats           [max. I, max. Q] of the last chunk (ADC levels)
+#   i_data          I channel of the last chunk (for the scope display)
+#   queue_stats()   (occupancy, slots, overruns) of its input queue
+#   set_skip(n)     drop input buffers as --skip does
+#   raw, raw_format the last chunk as read, and its format (see iq_file)
+# and, if it controls the frequency (opt.control == 'rtl'), an 'rtl'
+# object with center_freq and get_center_freq().
+
+import sys, time
+
+def open_source(opt):
+    """ Open and return the input source for opt.source.  (This starts the
+        input stream, so call it close to the start of the main loop.)
+        With --record, the source's chunks are also written to a file.
+    """
+    if opt.source == "rtl":             # RTL dongle (and freq control)
+        import iq_rtl
+        src = iq_rtl.RTL_In(opt)
+    elif opt.source == "rtl_tcp":       # rtl_tcp server (and freq control)
+        import iq_rtltcp
+        src = iq_rtltcp.RtlTcpIn(opt)
+    elif opt.source == "audio":         # audio card
+        import iq_af
+        src = iq_af.DataInput(opt)
+    elif opt.source == "file":          # recording (iq_file)
+        import iq_file
+        src = iq_file.FileSource(opt)
+    elif opt.source == "gen":           # signal generator (iq_gen)
+        import iq_gen
+        src = iq_gen.GenSource(opt)
+    else:
+        print "unrecognized mode:", opt.source
+        sys.exit()
+    if opt.record:
+        import iq_file
+        src = iq_file.Recording(opt, src)
+    return src
+
+def full_scale(opt):
+    """ Input sample value that is shown as 0 dB: RTL and generator
+        samples are scaled to +/- 1.0, audio samples are 16-bit.
+    """
+    if opt.source in ("rtl", "rtl_tcp", "gen") or \
+            (opt.source == "file" and opt.file_format in ("cu8", "cf32")):
+        return 1.
+    return 2.**15
+
+class Pacer(object):
+    """ Holds a source that has no clock of its own (file, generator) to
+        one chunk per chunk_time, unless --FAST.
+    """
+    def __init__(self, opt, chunk_time):
+        self.chunk_time = chunk_time
+        self.fast = opt.fast
+        self.t_next = time.time()
+
+    def wait(self):
+        """ Sleep until the next chunk is due.
+        """
+        if self.fast:
+            return
+        self.t_next += self.chunk_time
+        dt = self.t_next - time.time()
+        if dt > 0:
+            time.sleep(dt)
+        elif dt < -1.:                  # far behind (stalled): resync
+            self.t_next = time.time()
+
+if __name__ == '__main__':
+    print 'debug'
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+
+# Program iq_tune.py - Pick FFT size & buffers per chunk by benchmark.
+# Copyright (C) 2026 Mauri Niininen
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact the author by e-mail: ag1le@arrl.net
+#
+# Part of the iq.py program.
+
+# HISTORY
+# 10-17-2026 Initial version
+# 10-17-2026 Keep the requested size if it is fast enough; fast FFT sizes
+
+# As fft_bench.ipy shows, the speed of an FFT size like 288 or 384 depends
+# a lot on the machine.  With --AUTOTUNE we time the real DSP class for
+# FFT sizes near the requested --size (multiples of 32 with no prime
+# factors but 2, 3 and 5, so the FFT is fast and the resolution stays
+# close to what the user asked for) and for --n_buffers values that keep
+# the chunk within the latency target.  The candidates are timed nearest
+# to the requested size and n_buffers first, and the first one with a CPU
+# load (DSP time / chunk time) under LOAD_TARGET wins; so the requested
+# setting is kept if it is fast enough.  (Smaller FFTs always cost less
+# per sample, so the lowest load would always be the smallest size.)  If
+# none is fast enough, the lowest load wins.  Results are kept in
+# --tune_file per host and setup, so later starts skip the benchmark.
+# (Delete the file to force a new benchmark.)
+
+import os, copy, json, socket, time
+import numpy as np
+import iq_dsp as dsp
+
+BENCH_TIME = 0.25           # secs of benchmark per candidate (approx.)
+LOAD_TARGET = 0.5           # a candidate below this load is good enough
+
+def fast_length(n):
+    """ True if n has no prime factors but 2, 3 and 5.
+    """
+    for p in (2, 3, 5):
+        while n % p == 0:
+            n /= p
+    return n == 1
+
+def candidate_sizes(size):
+    """ Fast FFT sizes, multiples of 32, from 3/4 to 3/2 of size, and size.
+    """
+    lo = max(64, (size*3/4 + 31) / 32 * 32)
+    sizes = [n for n in range(lo, size*3/2 + 1, 32) if fast_length(n / 32)]
+    if size not in sizes:
+        sizes.append(size)
+    return sorted(sizes)
+
+def candidate_buffers(opt, size, latency):
+    """ n_buffers values for this size whose chunk fits the latency target.
+    """
+    nmax = max(1, int(latency * opt.sample_rate / size + 1e-6))
+    cands = set([nmax, max(1, nmax/2)])
+    if opt.buffers <= nmax:
+        cands.add(opt.buffers)
+    return sorted(cands)
+
+def bench(opt, size, buffers):
+    """ Return seconds per chunk for the real DSP with this size, buffers.
+    """
+    o = copy.copy(opt)
+    o.size, o.buffers = size, buffers
+    d = dsp.DSP(o)
+    n = size * buffers
+    data = (np.random.standard_normal(n) +
+            1j*np.random.standard_normal(n)).astype(np.complex64) * 1000.
+    d.GetLogPowerSpectrum(data)         # warm up: plans, buffers
+    reps, t0 = 0, time.time()
+    while True:
+        d.GetLogPowerSpectrum(data)
+        reps += 1
+        tt = time.time() - t0
+        if tt > BENCH_TIME and reps >= 3:
+            return tt / reps
+
+def cache_key(opt, width, latency):
+    return "%s|rate=%d|width=%d|fft=%s|size=%d|buffers=%d|latency=%.4f" \
+        "|target=%.2f" % (socket.gethostname(), opt.sample_rate, width,
+         opt.fft_backend, opt.size, opt.buffers, latency, LOAD_TARGET)
+
+def load_cache(fname):
+    try:
+        with open(fname) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return dict()
+
+def save_cache(fname, cache):
+    try:
+        with open(fname, 'w') as f:
+            json.dump(cache, f, indent=1, sort_keys=True)
+    except IOError as e:
+        print "Warning: cannot save autotune results:", e
+
+def autotune(opt, width):
+    """ Set opt.size and opt.buffers to the combination nearest to them
+        with a load under LOAD_TARGET (else the fastest), whose chunk
+        latency is within opt.tune_latency (secs; 0 = latency of the
+        current setting), for a display 'width' pixels wide.
+    """
+    latency = opt.tune_latency
+    if latency <= 0:
+        latency = float(opt.size * opt.buffers) / opt.sample_rate
+    fname = os.path.expanduser(opt.tune_file)
+    cache = load_cache(fname)
+    key = cache_key(opt, width, latency)
+    if key in cache:
+        best = cache[key]
+        print "Autotune (cached): size %d, n_buffers %d, load %.3f" % \
+                (best['size'], best['buffers'], best['load'])
+    else:
+        print "Autotune: benchmarking FFT sizes, please wait..."
+        cands = [(size, buffers) for size in candidate_sizes(opt.size)
+                    for buffers in candidate_buffers(opt, size, latency)]
+        # Nearest to the requested size, then n_buffers, first.
+        cands.sort(key=lambda c: (abs(c[0] - opt.size),
+                                  abs(c[1] - opt.buffers)))
+        best = None
+        for size, buffers in cands:
+            chunk_time = float(size * buffers) / opt.sample_rate
+            load = bench(opt, size, buffers) / chunk_time
+            print "  size %4d, n_buffers %3d: load %.3f" % \
+                    (size, buffers, load)
+            if best is None or load < best['load']:
+                best = dict(size=size, buffers=buffers, load=load)
+            if load < LOAD_TARGET:
+                break                   # (near enough, and fast enough)
+        if best is None:
+            print "Autotune: no candidate fits; keeping size %d." % opt.size
+            return
+        print "Autotune: size %d, n_buffers %d, load %.3f" % \
+                (best['size'], best['buffers'], best['load'])
+        cache[key] = best
+        save_cache(fname, cache)
+    opt.size, opt.buffers = best['size'], best['buffers']
+    return
+
+if __name__ == '__main__':
+    print 'debug'
@@ -22,41 +22,71 @@
 
 # HISTORY
 # 01-04-2014 Initial release
+# 10-17-2026 Vectorized column rendering with a uint32 palette table
+# 10-17-2026 Circular waterfall store, composited by draw() (no scroll)
+# 10-17-2026 Vectorized, cached palettes; user colormap tables
+# 10-17-2026 Any number of bins: peak (max) of the bins on each pixel row
+# 10-17-2026 One palette table for all ranges (no per-range table cache)
 
 import pygame as pg
 import numpy as np
 import math, sys
+import iq_dsp as dsp
 
-def palette_color(palette, val, vmin0, vmax0):
-    """ translate a data value into a color according to several different
-        methods. (PALETTE variable)
-        input: value of data, minimum value, maximum value for transform
-        return: pygame color tuple
+def palette_colors(palette, vals, vmin0, vmax0):
+    """ translate an array of data values into colors according to several
+        different methods. (PALETTE variable)
+        input: palette (1, 2, or an (m, 3) colormap table), data values,
+            minimum value, maximum value for transform
+        return: (n, 3) float array of r, g, b (0 - 255)
     """
-    f = (float(val) - vmin0) / (vmax0 - vmin0)     # btw 0 and 1.0
+    f = (np.asarray(vals, dtype=float) - vmin0) / (vmax0 - vmin0)  # btw 0 and 1.0
+    rgb = np.zeros((len(f), 3))
+    if isinstance(palette, np.ndarray):     # user table, spread over range
+        np.clip(f, 0., 1., out=f)
+        x = np.linspace(0., 1., len(palette))
+        for i in range(3):
+            rgb[:,i] = np.interp(f, x, palette[:,i])
+        return rgb
     f *= 2
-    f = min(1., max(0., f))
+    np.clip(f, 0., 1., out=f)
     if palette == 1:
-        g, b = 0, 0
-        if f < 0.333:
-            r = int(f*255*3)
-        elif f < 0.666:
-            r = 200
-            g = int((f-.333)*255*3)
-        else:
-            r = 200
-            g = 200
-            b = int((f-.666)*255*3)
+        lo = f < 0.333
+        hi = f >= 0.666
+        rgb[:,0] = np.where(lo, np.floor(f*255*3), 200)
+        rgb[:,1] = np.where(lo, 0, np.where(hi, 200, np.floor((f-.333)*255*3)))
+        rgb[:,2] = np.where(hi, np.floor((f-.666)*255*3), 0)
     elif palette == 2:
-        bright = min (1.0, f + 0.15)
+        bright = np.minimum(1.0, f + 0.15)
         tpi = 2 * math.pi
-        r = bright * 128 *(1.0 + math.cos(tpi*f))
-        g = bright * 128 *(1.0 + math.cos(tpi*f + tpi/3))
-        b = bright * 128 *(1.0 + math.cos(tpi*f + 2*tpi/3))
+        for i in range(3):
+            rgb[:,i] = bright * 128 *(1.0 + np.cos(tpi*f + i*tpi/3))
     else:
         print "Invalid palette requested!"
         sys.exit()
-    return ( max(0,min(255,r)), max(0,min(255,g)), max(0,min(255,b)) )
+    return np.clip(rgb, 0, 255, out=rgb)
+
+def palette_color(palette, val, vmin0, vmax0):
+    """ translate a data value into a color (see palette_colors).
+        return: pygame color tuple
+    """
+    return tuple(palette_colors(palette, [val], vmin0, vmax0)[0])
+
+def load_colormap(fname):
+    """ Read a user colormap table: one "r g b" line per color, from low
+        to high values, 0 - 255 (or 0 - 1.0).  Return (m, 3) array.
+    """
+    try:
+        table = np.atleast_2d(np.loadtxt(fname, dtype=float))[:,:3]
+    except (IOError, ValueError, IndexError) as e:
+        print "Cannot read colormap %s: %s" % (fname, e)
+        sys.exit()
+    if len(table) < 2 or table.shape[1] != 3:
+        print "Colormap %s needs at least 2 lines of r g b values." % fname
+        sys.exit()
+    if table.max() <= 1.0:
+        table *= 255.
+    return table
 
 class Wf(object):
     """ Make a waterfall '3d' display of spectral power vs frequency & time.
@@ -65,8 +95,8 @@ class Wf(object):
     """
     def __init__(self, opt, vmin, vmax, nsteps, pxsz):
         """ Initialize data and
-            pre-calculate palette & filled rect surfaces, based on vmin, vmax,
-            no. of surfaces = nsteps
+            pre-calculate palette lookup table, based on vmin, vmax,
+            no. of colors = nsteps
         """
         self.opt = opt
         self.vmin = vmin
@@ -76,18 +106,31 @@ class Wf(object):
         self.nsteps = nsteps
         self.pixel_size = pxsz
         self.firstcalc = True
+        # Each new waterfall line is drawn into this 32 bit, 1 pixel wide
+        # column surface (resized on first calculate), then blitted once.
+        self.colsurf = pg.Surface((1, 1), 0, 32)
+        # Palette is 1 or 2 (built in) or a user colormap table.
+        self.palette = opt.waterfall_palette
+        if opt.waterfall_cmap:
+            self.palette = load_colormap(opt.waterfall_cmap)
         self.initialize_palette()
         
+    def map_colors(self, rgb):
+        """ Pack an (n, 3) array of r,g,b into uint32 pixel values for
+            the column surface.
+        """
+        rs, gs, bs, _ = self.colsurf.get_shifts()
+        rgb = rgb.astype(np.uint32)
+        return (rgb[:,0] << rs) | (rgb[:,1] << gs) | (rgb[:,2] << bs)
+
     def initialize_palette(self):
-        """ Set up surfaces for each possible color value in list self.pixels.
+        """ Set up table self.lut of pixel values for each color step.
+            Step i is the color at i/nsteps of the range, whatever the
+            range is (calculate() scales the data to steps), so the table
+            is made once and range changes are instant.
         """
-        self.pixels = list()
-        for istep in range(self.nsteps):
-            ps = pg.Surface(self.pixel_size)
-            val = float(istep)*(self.vmax-self.vmin)/self.nsteps + self.vmin
-            color = palette_color(self.opt.waterfall_palette, val, self.vmin, self.vmax)
-            ps.fill( color )
-            self.pixels.append(ps)
+        vals = np.arange(self.nsteps) / float(self.nsteps)
+        self.lut = self.map_colors(palette_colors(self.palette, vals, 0., 1.))
 
     def set_range(self, vmin, vmax):
         """ define a new data range for palette calculation going forward.
@@ -95,14 +138,12 @@ class Wf(object):
         """
         self.vmin = vmin
         self.vmax = vmax
-        self.initialize_palette()
 
     def reset_range(self):
         """ reset palette data range to original settings.
         """
         self.vmin = self.vmin_rst
         self.vmax = self.vmax_rst
-        self.initialize_palette()
         return self.vmin, self.vmax
 
     def calculate(self, datalist, nsum, surface):   # (datalist is np.array)
@@ -112,7 +153,18 @@ class Wf(object):
             self.dx = float(surface.get_width()) / self.datasize # x spacing of wf cells
             self.dy = float(surface.get_height()) / self.datasize # y spacing of wf cells
             self.width = surface.get_width()
-            # Note: self.dx must be >= 1
+            self.height = surface.get_height()
+            # The surface is a circular store of waterfall lines: each new
+            # line overwrites column self.col, the oldest one.  See draw().
+            self.surface = surface
+            self.col = 0
+            # Which data point (frequency bin) colors each pixel row.  With
+            # more bins than rows, a row shows the peak of its bins.
+            self.rowmap = dsp.BinMap(self.datasize, self.height)
+            self.colsurf = pg.Surface((1, self.height), 0, 32)
+            self.vi = np.empty(self.height, datalist.dtype)    # work buffers
+            self.ci = np.empty(self.height, np.intp)
+            self.column = np.empty(self.height, np.uint32)
             self.wfcount = 0
             self.firstcalc = False
         self.wfcount += 1
@@ -120,15 +172,31 @@ class Wf(object):
         if self.wfcount % nsum != 0:        # Don't plot wf data until enough spectra accumulated
             return
         else:
-            #surface.blit(surface, (0,self.pixel_size[0]))  #push old wf down one row
-            surface.scroll(-1,0)  # AG1LE:  scroll waterfall to left by pixel 
-            for iy in xrange(self.datasize):
-                v = datalist[iy] #self.wfacc[ix] / nsum #datalist[ix]        # dB units
-                vi = int( self.nsteps * (v-self.vmin) / (self.vmax-self.vmin) )
-                vi = max(0, min(vi, self.nsteps-1) )
-                px_surf = self.pixels[vi] #paint spectrum pixels
-                y = int(iy * self.dy)
-                surface.blit(px_surf, (self.width-1,y))       # AG1LE: was surface.blit(px_surf, ( 0,x))
+            # Color index of every pixel row (dB units) in one expression,
+            # then pixel values for the whole column by table lookup.
+            self.rowmap.max(datalist, self.vi)      #self.wfacc / nsum #datalist
+            self.vi -= self.vmin
+            self.vi *= float(self.nsteps) / (self.vmax-self.vmin)
+            np.clip(self.vi, 0, self.nsteps-1, out=self.vi)
+            self.ci[...] = self.vi                  # (truncates, as int())
+            np.take(self.lut, self.ci, out=self.column)
+            px = pg.surfarray.pixels2d(self.colsurf)    # (locks colsurf)
+            px[0] = self.column
+            del px
+            surface.blit(self.colsurf, (self.col, 0))   # overwrite oldest line
+            self.col = (self.col + 1) % self.width
             self.wfcount = 0                        # Initialize counter
             self.wfacc.fill(0)                      #   and accumulator
-	
+
+    def draw(self, dest, pos):
+        """ Blit the waterfall to surface dest at pos, newest line at
+            right.  The store is circular, so this takes two blits.
+        """
+        if self.firstcalc:                          # nothing to show yet
+            return
+        x, y = pos
+        c = self.col                                # oldest line
+        w = self.width - c
+        dest.blit(self.surface, (x, y), (c, 0, w, self.height))
+        if c > 0:
+            dest.blit(self.surface, (x + w, y), (0, 0, c, self.height))
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+
+# Program iq_zoom.py - Zoom FFT: translate, decimate and FFT a sub-band.
+# Copyright (C) 2026 Mauri Niininen
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Contact the author by e-mail: ag1le@arrl.net
+#
+# Part of the iq.py program.
+
+# HISTORY
+# 10-17-2026 Initial version
+
+# With --zoom=D the chunk is also mixed down so that the selected offset
+# frequency is at 0 Hz, low-pass filtered and decimated by D, and the
+# narrow band stream gets its own FFT of --size bins.  So the zoomed view
+# spans sample_rate/D with D times the resolution, for about the cost of
+# one extra pass over the chunk.
+#
+# Mixer: a table of the LO for one chunk, times a phase carried over from
+# chunk to chunk (no exp() per sample, no phase jumps).
+# Filter: windowed sinc, TAPS_PER_PHASE * D taps, as a polyphase
+# decimator.  The input (with the last (TAPS_PER_PHASE-1)*D samples of the
+# previous chunk in front) is viewed as rows of D samples; each output
+# sample is then a sum of TAPS_PER_PHASE row . phase-filter products, so
+# the whole chunk takes TAPS_PER_PHASE matrix-vector products and nothing
+# is computed for the samples that are thrown away.
+
+import copy, math, sys
+import numpy as np
+import iq_dsp as dsp
+
+TAPS_PER_PHASE = 8          # filter length = TAPS_PER_PHASE * factor
+
+def valid_factors(chunk_size):
+    """ Zoom factors (powers of 2) that divide the chunk evenly.
+    """
+    f, factors = 2, []
+    while f <= chunk_size / 8 and chunk_size % f == 0:
+        factors.append(f)
+        f *= 2
+    return factors
+
+def lowpass(factor):
+    """ Windowed-sinc low pass for decimation by factor, unity DC gain.
+    """
+    ntaps = TAPS_PER_PHASE * factor
+    n = np.arange(ntaps) - (ntaps - 1) / 2.
+    h = np.sinc(n / factor) * np.blackman(ntaps)
+    return h / h.sum()
+
+class Zoom(object):
+    def __init__(self, opt, chunk_size, factor, full_scale=2**15):
+        self.opt = opt
+        self.full_scale = full_scale    # input level shown as 0 dB
+        self.chunk_size = chunk_size
+        self.factors = valid_factors(chunk_size)
+        if factor not in self.factors:
+            print "Invalid zoom factor %d for chunk of %d samples." % \
+                    (factor, chunk_size)
+            print "Choose one of:", ", ".join(str(f) for f in self.factors)
+            sys.exit()
+        self.dtype = np.complex64 if opt.single else np.complex128
+        self.phase = 0.             # LO phase at start of next chunk
+        self.offset = 0.            # Hz, center of zoomed view
+        self.sp_log = None          # last zoomed spectrum (dB)
+        self.set_factor(factor)
+        return
+
+    def set_factor(self, factor):
+        """ (Re)build filter, buffers and the narrow band DSP for factor.
+        """
+        opt, n = self.opt, self.chunk_size
+        self.factor = factor
+        self.rate = float(opt.sample_rate) / factor
+        nhist = (TAPS_PER_PHASE - 1) * factor
+        # Phase filters: g[j][c] = h[j*D + D-1-c]; complex, so dot() stays
+        # in BLAS.
+        self.g = lowpass(factor).reshape(TAPS_PER_PHASE, factor)[:,::-1] \
+                    .astype(self.dtype)
+        self.buf = np.zeros(nhist + n, self.dtype)  # history + mixed chunk
+        self.rows = self.buf.reshape(-1, factor)
+        self.nout = n / factor
+        self.y = np.empty(self.nout, self.dtype)
+        self.tmp = np.empty(self.nout, self.dtype)
+        # Narrow band DSP: as many FFT buffers as one chunk fills (at least
+        # one; until then samples wait in the fifo).
+        zopt = copy.copy(opt)
+        zopt.sample_rate = self.rate
+        zopt.buffers = max(1, self.nout / opt.size)
+        zopt.blank = "off"              # (wide band DSP did it already)
+        zopt.peak_hold = zopt.min_hold = False
+        self.zdsp = dsp.DSP(zopt, self.full_scale)
+        self.zlen = zopt.buffers * opt.size
+        self.fifo = np.empty(self.zlen + self.nout, self.dtype)
+        self.nfifo = 0
+        self.set_offset(self.offset)
+        return
+
+    def set_offset(self, offset):
+        """ Center the zoomed view at offset Hz from the center frequency.
+        """
+        lim = self.opt.sample_rate / 2. - self.rate / 2.
+        self.offset = max(-lim, min(lim, offset))
+        self.w = -2. * math.pi * self.offset / self.opt.sample_rate
+        self.lo = np.exp(1j * self.w * np.arange(self.chunk_size)) \
+                    .astype(self.dtype)
+        return
+
+    def process(self, data):
+        """ Add a chunk of wide band data.  Returns the new zoomed log power
+            spectrum when enough narrow band samples are in, else None.
+        """
+        n, P = self.chunk_size, TAPS_PER_PHASE
+        nhist = len(self.buf) - n
+        # Keep the filter history, then mix the new chunk in behind it.
+        self.buf[:nhist] = self.buf[n:]
+        mixed = self.buf[nhist:]
+        np.multiply(data[:n], self.lo, out=mixed)
+        mixed *= complex(math.cos(self.phase), math.sin(self.phase))
+        self.phase = (self.phase + self.w * n) % (2. * math.pi)
+        # Polyphase decimation: y[m] = sum_j rows[m+P-1-j] . g[j]
+        y, rows = self.y, self.rows
+        np.dot(rows[P-1:P-1+self.nout], self.g[0], out=y)
+        for j in xrange(1, P):
+            np.dot(rows[P-1-j:P-1-j+self.nout], self.g[j], out=self.tmp)
+            y += self.tmp
+        # Collect narrow band samples until there are enough for an FFT.
+        self.fifo[self.nfifo:self.nfifo+self.nout] = y
+        self.nfifo += self.nout
+        if self.nfifo < self.zlen:
+            return None
+        self.sp_log = self.zdsp.GetLogPowerSpectrum(self.fifo[:self.zlen])
+        left = self.nfifo - self.zlen
+        self.fifo[:left] = self.fifo[self.zlen:self.nfifo]
+        self.nfifo = left
+        return self.sp_log
+
+    def zoom(self, step):
+        """ step +1: next larger zoom factor, -1: next smaller.
+        """
+        i = self.factors.index(self.factor) + step
+        if 0 <= i < len(self.factors):
+            self.set_factor(self.factors[i])
+
+if __name__ == '__main__':
+    print 'debug'